@@ -2,12 +2,13 @@
 Agent SaaS API - V1 Production Ready
 Multi-tenant SaaS platform for AI employees management.
 """
-from fastapi import FastAPI, Depends, HTTPException, status, Request
+from fastapi import BackgroundTasks, FastAPI, Depends, HTTPException, status, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, EmailStr, Field
 from typing import List, Optional, Dict, Any
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from datetime import datetime, timedelta
 from contextlib import asynccontextmanager
 import structlog
@@ -56,6 +57,8 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down Agent SaaS API")
+    from services.queue_service import get_queue_service
+    await get_queue_service().close()
 
 
 # === FastAPI Application ===
@@ -483,6 +486,29 @@ def internal_get_workflow(
     if not workflow:
         raise HTTPException(status_code=404, detail="Workflow not found")
     
+    return _internal_workflow_dict(workflow)
+
+
+@app.get("/api/internal/workflows/{workflow_id}/full")
+def internal_get_workflow_with_tasks(
+    workflow_id: str,
+    _: bool = Depends(verify_internal_api_key),
+    db: Session = Depends(get_db)
+):
+    """[Internal] Workflow + tâches ordonnées en un seul appel."""
+    workflow = db.query(DBWorkflow).options(
+        selectinload(DBWorkflow.tasks)
+    ).filter(DBWorkflow.id == workflow_id).first()
+    if not workflow:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    
+    return {
+        **_internal_workflow_dict(workflow),
+        "tasks": [_internal_task_dict(t) for t in workflow.tasks],
+    }
+
+
+def _internal_workflow_dict(workflow: DBWorkflow) -> Dict[str, Any]:
     return {
         "id": workflow.id,
         "tenant_id": workflow.tenant_id,
@@ -508,18 +534,19 @@ def internal_get_workflow_tasks(
         DBWorkflowTask.workflow_id == workflow_id
     ).order_by(DBWorkflowTask.order).all()
     
-    return [
-        {
-            "id": t.id,
-            "name": t.name,
-            "task_type": t.task_type,
-            "config": t.config,
-            "order": t.order,
-            "next_task_on_success": t.next_task_on_success,
-            "next_task_on_failure": t.next_task_on_failure,
-        }
-        for t in tasks
-    ]
+    return [_internal_task_dict(t) for t in tasks]
+
+
+def _internal_task_dict(t: DBWorkflowTask) -> Dict[str, Any]:
+    return {
+        "id": t.id,
+        "name": t.name,
+        "task_type": t.task_type,
+        "config": t.config,
+        "order": t.order,
+        "next_task_on_success": t.next_task_on_success,
+        "next_task_on_failure": t.next_task_on_failure,
+    }
 
 
 # --- Internal: Executions ---
@@ -571,6 +598,34 @@ def internal_update_execution(
     return {"message": "Updated", "status": execution.status}
 
 
+@app.delete("/api/internal/executions/cleanup")
+def internal_cleanup_executions(
+    before: datetime,
+    after: Optional[datetime] = None,
+    _: bool = Depends(verify_internal_api_key),
+    db: Session = Depends(get_db)
+):
+    """[Internal] Supprime les exécutions terminées créées dans [after, before) (cron worker)."""
+    query = db.query(DBWorkflowExecution).filter(
+        DBWorkflowExecution.created_at < before,
+        DBWorkflowExecution.status.in_(["completed", "failed", "cancelled"]),
+    )
+    if after is not None:
+        query = query.filter(DBWorkflowExecution.created_at >= after)
+
+    deleted = query.delete(synchronize_session=False)
+    db.commit()
+
+    logger.info(
+        "executions_cleaned_up",
+        before=before.isoformat(),
+        after=after.isoformat() if after else None,
+        deleted=deleted
+    )
+
+    return {"deleted": deleted}
+
+
 # --- Internal: Agents ---
 
 @app.get("/api/internal/agents/{agent_id}")
@@ -854,7 +909,7 @@ def get_llm_config(
     )
 
 @app.put("/api/llm/config", response_model=LLMConfigResponse)
-def update_llm_config(
+async def update_llm_config(
     data: LLMConfigUpdate,
     current_user: DBUser = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -866,17 +921,25 @@ def update_llm_config(
     if current_user.role not in ["owner", "admin"]:
         raise HTTPException(status_code=403, detail="Permission denied")
     
+    tenant_id = current_user.tenant_id
     service = TenantLLMService(db)
-    config = service.update_config(
-        tenant_id=current_user.tenant_id,
-        usage_mode=data.usage_mode,
-        byok_openai_key=data.byok_openai_key,
-        byok_anthropic_key=data.byok_anthropic_key,
-        byok_groq_key=data.byok_groq_key,
-        preferred_provider=data.preferred_provider,
-        preferred_model=data.preferred_model,
-    )
-    available_models = service.get_available_models(current_user.tenant_id)
+    
+    def save_config():
+        # ORM synchrone : exécuté dans le threadpool, pas sur la boucle
+        config = service.update_config(
+            tenant_id=tenant_id,
+            usage_mode=data.usage_mode,
+            byok_openai_key=data.byok_openai_key,
+            byok_anthropic_key=data.byok_anthropic_key,
+            byok_groq_key=data.byok_groq_key,
+            preferred_provider=data.preferred_provider,
+            preferred_model=data.preferred_model,
+        )
+        return config, service.get_available_models(tenant_id, config)
+    
+    config, available_models = await run_in_threadpool(save_config)
+    await service.invalidate_token_counters(tenant_id)
+    await service.publish_config_invalidation(tenant_id)
     
     return LLMConfigResponse(
         usage_mode=config.usage_mode,
@@ -2083,8 +2146,18 @@ def create_agent(agent: AgentCreate, db: Session = Depends(get_db)):
     db.refresh(db_agent)
     return db_agent
 
+def _invalidate_worker_cache(background_tasks: BackgroundTasks, kind: str, entity_id: str):
+    """Après la réponse : publie `cache:invalidate:{kind}:{id}` pour les workers."""
+    from services.queue_service import get_queue_service
+    background_tasks.add_task(get_queue_service().publish_cache_invalidation, kind, entity_id)
+
 @app.put("/api/agents/{agent_id}", response_model=AgentResponse)
-def update_agent(agent_id: str, agent: AgentUpdate, db: Session = Depends(get_db)):
+def update_agent(
+    agent_id: str,
+    agent: AgentUpdate,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+):
     db_agent = db.query(DBAgent).filter(DBAgent.id == agent_id).first()
     if not db_agent:
         raise HTTPException(status_code=404, detail="Agent not found")
@@ -2111,15 +2184,17 @@ def update_agent(agent_id: str, agent: AgentUpdate, db: Session = Depends(get_db
     
     db.commit()
     db.refresh(db_agent)
+    _invalidate_worker_cache(background_tasks, "agent", agent_id)
     return db_agent
 
 @app.delete("/api/agents/{agent_id}")
-def delete_agent(agent_id: str, db: Session = Depends(get_db)):
+def delete_agent(agent_id: str, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     db_agent = db.query(DBAgent).filter(DBAgent.id == agent_id).first()
     if not db_agent:
         raise HTTPException(status_code=404, detail="Agent not found")
     db.delete(db_agent)
     db.commit()
+    _invalidate_worker_cache(background_tasks, "agent", agent_id)
     return {"message": "Agent deleted"}
 
 @app.get("/api/agents/categories/list")
@@ -2799,7 +2874,12 @@ def create_workflow(workflow: WorkflowCreate, db: Session = Depends(get_db)):
     return db_workflow
 
 @app.put("/api/workflows/{workflow_id}", response_model=WorkflowResponse)
-def update_workflow(workflow_id: str, workflow: WorkflowUpdate, db: Session = Depends(get_db)):
+def update_workflow(
+    workflow_id: str,
+    workflow: WorkflowUpdate,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+):
     """Met à jour un workflow"""
     db_workflow = db.query(DBWorkflow).filter(DBWorkflow.id == workflow_id).first()
     if not db_workflow:
@@ -2814,10 +2894,11 @@ def update_workflow(workflow_id: str, workflow: WorkflowUpdate, db: Session = De
     
     db.commit()
     db.refresh(db_workflow)
+    _invalidate_worker_cache(background_tasks, "workflow", workflow_id)
     return db_workflow
 
 @app.delete("/api/workflows/{workflow_id}")
-def delete_workflow(workflow_id: str, db: Session = Depends(get_db)):
+def delete_workflow(workflow_id: str, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     """Supprime un workflow et ses tâches"""
     db_workflow = db.query(DBWorkflow).filter(DBWorkflow.id == workflow_id).first()
     if not db_workflow:
@@ -2832,13 +2913,19 @@ def delete_workflow(workflow_id: str, db: Session = Depends(get_db)):
     # Supprimer le workflow
     db.delete(db_workflow)
     db.commit()
+    _invalidate_worker_cache(background_tasks, "workflow", workflow_id)
     return {"message": "Workflow deleted"}
 
 
 # --- Workflow Tasks Endpoints ---
 
 @app.post("/api/workflows/{workflow_id}/tasks", response_model=WorkflowTaskResponse)
-def add_workflow_task(workflow_id: str, task: WorkflowTaskCreate, db: Session = Depends(get_db)):
+def add_workflow_task(
+    workflow_id: str,
+    task: WorkflowTaskCreate,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+):
     """Ajoute une tâche à un workflow"""
     workflow = db.query(DBWorkflow).filter(DBWorkflow.id == workflow_id).first()
     if not workflow:
@@ -2852,10 +2939,17 @@ def add_workflow_task(workflow_id: str, task: WorkflowTaskCreate, db: Session =
     db.add(db_task)
     db.commit()
     db.refresh(db_task)
+    _invalidate_worker_cache(background_tasks, "workflow", workflow_id)
     return db_task
 
 @app.put("/api/workflows/{workflow_id}/tasks/{task_id}", response_model=WorkflowTaskResponse)
-def update_workflow_task(workflow_id: str, task_id: str, task: WorkflowTaskCreate, db: Session = Depends(get_db)):
+def update_workflow_task(
+    workflow_id: str,
+    task_id: str,
+    task: WorkflowTaskCreate,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+):
     """Met à jour une tâche"""
     db_task = db.query(DBWorkflowTask).filter(
         DBWorkflowTask.id == task_id,
@@ -2869,10 +2963,16 @@ def update_workflow_task(workflow_id: str, task_id: str, task: WorkflowTaskCreat
     
     db.commit()
     db.refresh(db_task)
+    _invalidate_worker_cache(background_tasks, "workflow", workflow_id)
     return db_task
 
 @app.delete("/api/workflows/{workflow_id}/tasks/{task_id}")
-def delete_workflow_task(workflow_id: str, task_id: str, db: Session = Depends(get_db)):
+def delete_workflow_task(
+    workflow_id: str,
+    task_id: str,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+):
     """Supprime une tâche"""
     db_task = db.query(DBWorkflowTask).filter(
         DBWorkflowTask.id == task_id,
@@ -2883,31 +2983,29 @@ def delete_workflow_task(workflow_id: str, task_id: str, db: Session = Depends(g
     
     db.delete(db_task)
     db.commit()
+    _invalidate_worker_cache(background_tasks, "workflow", workflow_id)
     return {"message": "Task deleted"}
 
 
 # --- Workflow Execution Endpoints ---
 
-@app.post("/api/workflows/{workflow_id}/execute", response_model=WorkflowExecutionResponse)
-def execute_workflow(
-    workflow_id: str, 
-    execution: WorkflowExecutionCreate, 
-    user: DBUser = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Lance l'exécution d'un workflow via le worker async."""
-    from services.queue_service import get_queue_service
-    
+def _create_workflow_execution(
+    db: Session,
+    workflow_id: str,
+    tenant_id: str,
+    input_data: Dict[str, Any],
+) -> DBWorkflowExecution:
+    """Valide les inputs et crée l'exécution (ORM synchrone : appelé hors de la boucle)."""
     workflow = db.query(DBWorkflow).filter(
         DBWorkflow.id == workflow_id,
-        DBWorkflow.tenant_id == user.tenant_id
+        DBWorkflow.tenant_id == tenant_id
     ).first()
     if not workflow:
         raise HTTPException(status_code=404, detail="Workflow not found")
     
     # Valider les inputs requis
     for field in workflow.input_schema:
-        if field.get("required", True) and field["name"] not in execution.input_data:
+        if field.get("required", True) and field["name"] not in input_data:
             if not field.get("default"):
                 raise HTTPException(
                     status_code=400, 
@@ -2919,41 +3017,74 @@ def execute_workflow(
         id=str(generate_uuid()),
         workflow_id=workflow_id,
         status="pending",
-        input_data=execution.input_data,
+        input_data=input_data,
         variables={},
         started_at=datetime.utcnow()
     )
     db.add(db_execution)
     db.commit()
     db.refresh(db_execution)
+    return db_execution
+
+
+def _save_execution_status(
+    db: Session,
+    db_execution: DBWorkflowExecution,
+    status: str,
+    **fields: Any,
+) -> DBWorkflowExecution:
+    """Met à jour le statut d'une exécution (ORM synchrone : appelé hors de la boucle)."""
+    db_execution.status = status
+    for name, value in fields.items():
+        setattr(db_execution, name, value)
+    db.commit()
+    db.refresh(db_execution)
+    return db_execution
+
+
+@app.post("/api/workflows/{workflow_id}/execute", response_model=WorkflowExecutionResponse)
+async def execute_workflow(
+    workflow_id: str, 
+    execution: WorkflowExecutionCreate, 
+    user: DBUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Lance l'exécution d'un workflow via le worker async.
+    
+    Les accès DB passent par le threadpool, seuls les appels Redis
+    s'exécutent sur la boucle.
+    """
+    from services.queue_service import get_queue_service
+    
+    # Lu avant le commit, qui expire aussi `user` (même session)
+    tenant_id = user.tenant_id
+    db_execution = await run_in_threadpool(
+        _create_workflow_execution, db, workflow_id, tenant_id, execution.input_data
+    )
     
     # Envoyer au worker via Redis
     queue = get_queue_service()
-    if queue.is_available():
-        success = queue.enqueue_workflow(
+    if await queue.is_available():
+        success = await queue.enqueue_workflow(
             execution_id=db_execution.id,
             workflow_id=workflow_id,
-            tenant_id=user.tenant_id,
+            tenant_id=tenant_id,
             input_data=execution.input_data,
             priority=execution.input_data.get("_priority", "normal")
         )
         if success:
-            db_execution.status = "queued"
+            update = {"status": "queued"}
             logger.info("workflow_queued", execution_id=db_execution.id, workflow_id=workflow_id)
         else:
-            db_execution.status = "failed"
-            db_execution.error = "Failed to enqueue workflow"
+            update = {"status": "failed", "error_message": "Failed to enqueue workflow"}
             logger.error("workflow_enqueue_failed", execution_id=db_execution.id)
     else:
         # Fallback: marquer comme running pour traitement synchrone (dev mode)
-        db_execution.status = "running"
-        db_execution.current_task_order = "1"
+        update = {"status": "running", "current_task_order": "1"}
         logger.warning("redis_unavailable_sync_mode", execution_id=db_execution.id)
     
-    db.commit()
-    db.refresh(db_execution)
-    
-    return db_execution
+    return await run_in_threadpool(_save_execution_status, db, db_execution, **update)
 
 @app.get("/api/workflows/{workflow_id}/executions", response_model=List[WorkflowExecutionResponse])
 def get_workflow_executions(
@@ -3022,12 +3153,12 @@ class QueueStatusResponse(BaseModel):
 
 
 @app.get("/api/queue/status", response_model=QueueStatusResponse)
-def get_queue_status(user: DBUser = Depends(require_permission("workflows", "read"))):
+async def get_queue_status(user: DBUser = Depends(require_permission("workflows", "read"))):
     """Vérifie le statut de la queue Redis et du worker."""
     from services.queue_service import get_queue_service
     
     queue = get_queue_service()
-    available = queue.is_available()
+    available = await queue.is_available()
     
     queue_length = 0
     worker_active = False
@@ -3035,9 +3166,9 @@ def get_queue_status(user: DBUser = Depends(require_permission("workflows", "rea
     if available:
         try:
             # Compter les jobs en attente
-            queue_length = queue.client.llen("arq:queue:default")
+            queue_length = await queue.client.llen("arq:queue:default")
             # Vérifier si le worker est actif (heartbeat)
-            worker_active = queue.client.exists("arq:worker:health") > 0
+            worker_active = await queue.client.exists("arq:worker:health") > 0
         except Exception:
             pass
     
@@ -3062,7 +3193,7 @@ class AgentTaskResponse(BaseModel):
 
 
 @app.post("/api/agents/{agent_id}/tasks", response_model=AgentTaskResponse)
-def create_agent_task(
+async def create_agent_task(
     agent_id: str,
     task: AgentTaskRequest,
     user: DBUser = Depends(require_permission("agents", "execute")),
@@ -3074,18 +3205,20 @@ def create_agent_task(
     """
     from services.queue_service import get_queue_service
     
-    # Vérifier que l'agent existe
-    agent = db.query(DBAgent).filter(
-        DBAgent.id == agent_id,
-        DBAgent.tenant_id == user.tenant_id
-    ).first()
+    # Vérifier que l'agent existe (ORM synchrone : hors de la boucle)
+    agent = await run_in_threadpool(
+        lambda: db.query(DBAgent).filter(
+            DBAgent.id == agent_id,
+            DBAgent.tenant_id == user.tenant_id
+        ).first()
+    )
     if not agent:
         raise HTTPException(status_code=404, detail="Agent not found")
     
     queue = get_queue_service()
     
-    if task.async_mode and queue.is_available():
-        job_id = queue.enqueue_agent_task(
+    if task.async_mode and await queue.is_available():
+        job_id = await queue.enqueue_agent_task(
             task_type=task.task_type,
             agent_id=agent_id,
             tenant_id=user.tenant_id,
@@ -3105,7 +3238,7 @@ def create_agent_task(
 
 
 @app.get("/api/tasks/{job_id}/status", response_model=AgentTaskResponse)
-def get_task_status(
+async def get_task_status(
     job_id: str,
     user: DBUser = Depends(get_current_user)
 ):
@@ -3113,7 +3246,7 @@ def get_task_status(
     from services.queue_service import get_queue_service
     
     queue = get_queue_service()
-    status = queue.get_job_status(job_id)
+    status = await queue.get_job_status(job_id)
     
     if status:
         return AgentTaskResponse(
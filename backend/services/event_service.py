@@ -6,6 +6,7 @@ import asyncio
 import json
 from typing import AsyncGenerator, Dict, Any, Optional, Set
 from datetime import datetime
+import msgspec
 import redis.asyncio as aioredis
 import structlog
 
@@ -14,6 +15,21 @@ from config import settings
 logger = structlog.get_logger()
 
 
+# Suffix of the msgpack-framed channel the worker publishes on
+MSGPACK_CHANNEL_SUFFIX = ":mp"
+
+
+class WorkerEvent(msgspec.Struct, array_like=True):
+    """Worker event schema (mirrors `WorkflowEvent` in worker/tasks/workflow_tasks.py)."""
+    type: str
+    tenant_id: str
+    data: Dict[str, Any]
+    ts_ns: int
+
+
+_WORKER_EVENT_DECODER = msgspec.msgpack.Decoder(WorkerEvent)
+
+
 class EventService:
     """Service pour gérer les événements temps réel via SSE + Redis Pub/Sub."""
     
@@ -35,6 +51,8 @@ class EventService:
     def __init__(self):
         self.redis_url = settings.REDIS_URL
         self._redis: Optional[aioredis.Redis] = None
+        # Subscriptions read binary (msgpack) payloads: no response decoding
+        self._raw_redis: Optional[aioredis.Redis] = None
         self._pubsub: Optional[aioredis.client.PubSub] = None
         # Active SSE connections per tenant
         self._connections: Dict[str, Set[asyncio.Queue]] = {}
@@ -49,12 +67,20 @@ class EventService:
             )
         return self._redis
     
+    async def get_raw_redis(self) -> aioredis.Redis:
+        """Get or create the Redis connection used for subscriptions."""
+        if self._raw_redis is None:
+            self._raw_redis = await aioredis.from_url(self.redis_url)
+        return self._raw_redis
+    
     async def close(self):
         """Close Redis connections."""
         if self._pubsub:
             await self._pubsub.close()
         if self._redis:
             await self._redis.close()
+        if self._raw_redis:
+            await self._raw_redis.close()
     
     # === Publishing Events ===
     
@@ -170,14 +196,16 @@ class EventService:
         })
         
         try:
-            redis = await self.get_redis()
+            redis = await self.get_raw_redis()
             pubsub = redis.pubsub()
-            await pubsub.subscribe(channel)
+            await pubsub.subscribe(channel, channel + MSGPACK_CHANNEL_SUFFIX)
             
             # Listen for messages
             async for message in pubsub.listen():
                 if message["type"] == "message":
-                    event_data = json.loads(message["data"])
+                    event_data = self._decode_event(message["channel"], message["data"])
+                    if event_data is None:
+                        continue
                     
                     # Filter by user if specified
                     if user_id and event_data.get("user_id"):
@@ -192,7 +220,25 @@ class EventService:
             # Cleanup
             if tenant_id in self._connections:
                 self._connections[tenant_id].discard(queue)
-            await pubsub.unsubscribe(channel)
+            await pubsub.unsubscribe()
+    
+    def _decode_event(self, channel: bytes, data: bytes) -> Optional[Dict[str, Any]]:
+        """Decode a pub/sub payload (msgpack from the worker, JSON otherwise)."""
+        if not channel.decode().endswith(MSGPACK_CHANNEL_SUFFIX):
+            return json.loads(data)
+        
+        try:
+            event = _WORKER_EVENT_DECODER.decode(data)
+        except msgspec.DecodeError as e:
+            logger.warning("worker_event_invalid", error=str(e))
+            return None
+        
+        return {
+            "type": event.type,
+            "tenant_id": event.tenant_id,
+            "data": event.data,
+            "timestamp": datetime.utcfromtimestamp(event.ts_ns / 1e9).isoformat(),
+        }
     
     def _format_sse(self, data: Dict[str, Any]) -> str:
         """Format data as SSE event."""
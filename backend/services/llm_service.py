@@ -3,7 +3,7 @@ LLM Service - Manages LLM access based on tenant plan and configuration.
 Supports Platform tokens, BYOK (Bring Your Own Key), and hybrid modes.
 """
 from typing import Optional, Dict, Any, List
-from datetime import datetime
+from datetime import datetime, timezone
 from sqlalchemy.orm import Session
 import structlog
 
@@ -16,6 +16,7 @@ from database import (
 from llm import LLMRouter, TaskType
 from llm.base import Message, MessageRole, LLMResponse
 from llm.providers import get_available_providers, get_provider
+from services.queue_service import get_queue_service
 
 logger = structlog.get_logger()
 
@@ -55,6 +56,20 @@ TIER_MODELS = {
     ],
 }
 
+# (input, output) price per 1M tokens, flattened once for the cost hot path
+_MODEL_PRICING_TUPLES = {
+    model: (pricing["input"], pricing["output"])
+    for model, pricing in MODEL_PRICING.items()
+}
+_DEFAULT_PRICING = (0.0, 0.0)
+
+# Redis token counters (read path of check_token_limit_cached)
+TOKENS_USED_KEY = "llm:tokens_used:{tenant_id}"
+TOKENS_LIMIT_KEY = "llm:tokens_limit:{tenant_id}"
+TOKENS_RESET_KEY = "llm:tokens_reset_at:{tenant_id}"
+_UNLIMITED = -1  # monthly_token_limit is None
+_BYOK = -2  # no platform limit at all
+
 
 class TenantLLMService:
     """
@@ -115,8 +130,10 @@ class TenantLLMService:
         Returns:
             Dict with 'allowed', 'remaining', 'limit', 'reset_at'
         """
-        config = self.get_tenant_config(tenant_id)
-        
+        return self._check_config_limit(self.get_tenant_config(tenant_id), estimated_tokens)
+    
+    def _check_config_limit(self, config: DBTenantLLMConfig, estimated_tokens: int) -> Dict[str, Any]:
+        """check_token_limit on an already loaded config row."""
         # BYOK mode has no platform limits
         if config.usage_mode == LLMUsageMode.BYOK.value:
             return {
@@ -154,9 +171,136 @@ class TenantLLMService:
             "mode": "platform",
         }
     
-    def get_available_models(self, tenant_id: str) -> List[Dict[str, str]]:
-        """Get models available for a tenant based on their plan."""
-        config = self.get_tenant_config(tenant_id)
+    async def check_token_limit_cached(
+        self,
+        tenant_id: str,
+        estimated_tokens: int = 0,
+    ) -> Dict[str, Any]:
+        """
+        Same contract as check_token_limit, served from Redis counters.
+        
+        One MGET replaces the DB read: the usage mode, limit and reset date
+        are cached next to the usage counter. Falls back to the DB check
+        (and re-primes the counters) when Redis is unavailable or the keys
+        are cold - they expire at limit_reset_at, so the monthly reset
+        still goes through check_token_limit.
+        """
+        if not settings.REDIS_URL:
+            return self.check_token_limit(tenant_id, estimated_tokens)
+        
+        keys = (
+            TOKENS_USED_KEY.format(tenant_id=tenant_id),
+            TOKENS_LIMIT_KEY.format(tenant_id=tenant_id),
+            TOKENS_RESET_KEY.format(tenant_id=tenant_id),
+        )
+        
+        try:
+            used, limit, reset_at = await get_queue_service().client.mget(*keys)
+        except Exception as e:
+            logger.warning("token_counter_unavailable", tenant_id=tenant_id, error=str(e))
+            return self.check_token_limit(tenant_id, estimated_tokens)
+        
+        if used is None or limit is None or reset_at is None:
+            config = self.get_tenant_config(tenant_id)
+            result = self._check_config_limit(config, estimated_tokens)
+            await self._prime_token_counters(config)
+            return result
+        
+        used, limit = int(used), int(limit)
+        
+        if limit == _BYOK:
+            return {
+                "allowed": True,
+                "remaining": None,
+                "limit": None,
+                "mode": "byok",
+            }
+        
+        if limit == _UNLIMITED:
+            return {
+                "allowed": True,
+                "remaining": None,
+                "limit": None,
+                "mode": "platform",
+            }
+        
+        remaining = limit - used
+        if isinstance(reset_at, bytes):
+            reset_at = reset_at.decode()
+        
+        return {
+            "allowed": remaining >= estimated_tokens,
+            "remaining": remaining,
+            "limit": limit,
+            "used": used,
+            "reset_at": reset_at or None,
+            "mode": "platform",
+        }
+    
+    async def _prime_token_counters(self, config: DBTenantLLMConfig):
+        """Seed the Redis token counters from the tenant's DB row."""
+        used_key = TOKENS_USED_KEY.format(tenant_id=config.tenant_id)
+        limit_key = TOKENS_LIMIT_KEY.format(tenant_id=config.tenant_id)
+        reset_key = TOKENS_RESET_KEY.format(tenant_id=config.tenant_id)
+        if config.usage_mode == LLMUsageMode.BYOK.value:
+            limit = _BYOK
+        else:
+            limit = config.monthly_token_limit if config.monthly_token_limit is not None else _UNLIMITED
+        
+        try:
+            pipe = get_queue_service().client.pipeline(transaction=False)
+            pipe.set(used_key, config.tokens_used_this_month or 0)
+            pipe.set(limit_key, limit)
+            # Empty string: no reset date (the key must exist to count as warm)
+            pipe.set(reset_key, config.limit_reset_at.isoformat() if config.limit_reset_at else "")
+            if config.limit_reset_at:
+                reset_ts = int(config.limit_reset_at.replace(tzinfo=timezone.utc).timestamp())
+                for key in (used_key, limit_key, reset_key):
+                    pipe.expireat(key, reset_ts)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning("token_counter_prime_failed", tenant_id=config.tenant_id, error=str(e))
+    
+    async def _incr_token_counter(self, tenant_id: str, tokens: int):
+        """Mirror a platform usage increment into the Redis counter."""
+        if not settings.REDIS_URL:
+            return
+        try:
+            await get_queue_service().client.incrby(
+                TOKENS_USED_KEY.format(tenant_id=tenant_id), tokens
+            )
+        except Exception as e:
+            logger.warning("token_counter_incr_failed", tenant_id=tenant_id, error=str(e))
+    
+    async def invalidate_token_counters(self, tenant_id: str):
+        """Drop the Redis token counters; the next check re-primes them from DB."""
+        if not settings.REDIS_URL:
+            return
+        try:
+            await get_queue_service().client.delete(
+                TOKENS_USED_KEY.format(tenant_id=tenant_id),
+                TOKENS_LIMIT_KEY.format(tenant_id=tenant_id),
+                TOKENS_RESET_KEY.format(tenant_id=tenant_id),
+            )
+        except Exception as e:
+            logger.warning("token_counter_invalidate_failed", tenant_id=tenant_id, error=str(e))
+    
+    async def publish_config_invalidation(self, tenant_id: str):
+        """Tell workers to drop their cached copy of this tenant's LLM config."""
+        if not settings.REDIS_URL:
+            return
+        try:
+            await get_queue_service().client.publish(f"cache:invalidate:llm_config:{tenant_id}", "")
+        except Exception as e:
+            logger.warning("llm_config_invalidate_failed", tenant_id=tenant_id, error=str(e))
+    
+    def get_available_models(
+        self,
+        tenant_id: str,
+        config: Optional[DBTenantLLMConfig] = None,
+    ) -> List[Dict[str, str]]:
+        """Get models available for a tenant based on their plan (config row reused if given)."""
+        config = config or self.get_tenant_config(tenant_id)
         
         # BYOK mode: all models they have keys for
         if config.usage_mode == LLMUsageMode.BYOK.value:
@@ -183,9 +327,13 @@ class TenantLLMService:
         
         return available
     
-    def _get_providers_for_tenant(self, tenant_id: str) -> Dict:
-        """Get LLM providers configured for a tenant."""
-        config = self.get_tenant_config(tenant_id)
+    def _get_providers_for_tenant(
+        self,
+        tenant_id: str,
+        config: Optional[DBTenantLLMConfig] = None,
+    ) -> Dict:
+        """Get LLM providers configured for a tenant (config row reused if given)."""
+        config = config or self.get_tenant_config(tenant_id)
         
         # Platform mode: use platform keys
         if config.usage_mode == LLMUsageMode.PLATFORM.value:
@@ -220,11 +368,9 @@ class TenantLLMService:
     
     def _calculate_cost(self, model: str, prompt_tokens: int, completion_tokens: int) -> float:
         """Calculate estimated cost in USD."""
-        pricing = MODEL_PRICING.get(model, {"input": 0.0, "output": 0.0})
+        input_price, output_price = _MODEL_PRICING_TUPLES.get(model, _DEFAULT_PRICING)
         # Pricing is per 1M tokens
-        input_cost = (prompt_tokens / 1_000_000) * pricing["input"]
-        output_cost = (completion_tokens / 1_000_000) * pricing["output"]
-        return input_cost + output_cost
+        return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
     
     def _log_usage(
         self,
@@ -236,6 +382,7 @@ class TenantLLMService:
         conversation_id: Optional[str] = None,
         usage_mode: str = "platform",
         error: Optional[str] = None,
+        config: Optional[DBTenantLLMConfig] = None,
     ):
         """Log LLM usage for billing and analytics."""
         cost = self._calculate_cost(
@@ -244,29 +391,30 @@ class TenantLLMService:
             response.usage.completion_tokens,
         )
         
-        log = DBLLMUsageLog(
-            tenant_id=tenant_id,
-            user_id=user_id,
-            provider=response.provider,
-            model=response.model,
-            prompt_tokens=response.usage.prompt_tokens,
-            completion_tokens=response.usage.completion_tokens,
-            total_tokens=response.usage.total_tokens,
-            estimated_cost_usd=cost,
-            agent_id=agent_id,
-            task_type=task_type,
-            conversation_id=conversation_id,
-            latency_ms=response.latency_ms,
-            success=error is None,
-            error_message=error,
-            usage_mode=usage_mode,
-            billing_period=datetime.utcnow().strftime("%Y-%m"),
-        )
-        self.db.add(log)
+        # Plain mapping + bulk insert: skips ORM instance construction/state tracking
+        log = {
+            "tenant_id": tenant_id,
+            "user_id": user_id,
+            "provider": response.provider,
+            "model": response.model,
+            "prompt_tokens": response.usage.prompt_tokens,
+            "completion_tokens": response.usage.completion_tokens,
+            "total_tokens": response.usage.total_tokens,
+            "estimated_cost_usd": cost,
+            "agent_id": agent_id,
+            "task_type": task_type,
+            "conversation_id": conversation_id,
+            "latency_ms": response.latency_ms,
+            "success": error is None,
+            "error_message": error,
+            "usage_mode": usage_mode,
+            "billing_period": datetime.utcnow().strftime("%Y-%m"),
+        }
+        self.db.bulk_insert_mappings(DBLLMUsageLog, [log])
         
         # Update token usage counter (platform mode only)
         if usage_mode == "platform":
-            config = self.get_tenant_config(tenant_id)
+            config = config or self.get_tenant_config(tenant_id)
             config.tokens_used_this_month += response.usage.total_tokens
         
         self.db.commit()
@@ -296,10 +444,8 @@ class TenantLLMService:
         Returns:
             Response dict with content, usage, cost
         """
-        config = self.get_tenant_config(tenant_id)
-        
-        # Check token limits (platform mode)
-        limit_check = self.check_token_limit(tenant_id, estimated_tokens=500)
+        # Check token limits (platform mode): Redis only, no DB read when warm
+        limit_check = await self.check_token_limit_cached(tenant_id, estimated_tokens=500)
         if not limit_check["allowed"]:
             return {
                 "error": "token_limit_exceeded",
@@ -310,8 +456,11 @@ class TenantLLMService:
                 "reset_at": limit_check["reset_at"],
             }
         
+        # Config row loaded once, reused for providers, models and usage logging
+        config = self.get_tenant_config(tenant_id)
+        
         # Get providers for this tenant
-        providers = self._get_providers_for_tenant(tenant_id)
+        providers = self._get_providers_for_tenant(tenant_id, config)
         
         if not providers:
             return {
@@ -320,7 +469,7 @@ class TenantLLMService:
             }
         
         # Filter models based on tenant's tier
-        available_models = self.get_available_models(tenant_id)
+        available_models = self.get_available_models(tenant_id, config)
         available_model_names = [m["model"] for m in available_models]
         
         # Create router with tenant's providers
@@ -378,7 +527,10 @@ class TenantLLMService:
                 task_type=task_type.value,
                 agent_id=agent_config.get("id") if agent_config else None,
                 usage_mode=usage_mode,
+                config=config,
             )
+            if usage_mode == "platform":
+                await self._incr_token_counter(tenant_id, response.usage.total_tokens)
             
             logger.info(
                 "Tenant LLM chat completed",
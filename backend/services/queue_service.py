@@ -3,7 +3,7 @@ Queue Service - Intégration Redis pour les tâches async.
 Envoie des jobs au worker LangGraph via Redis.
 """
 import json
-import redis
+import redis.asyncio as aioredis
 from typing import Any, Dict, Optional
 from datetime import datetime
 import structlog
@@ -18,27 +18,34 @@ class QueueService:
     
     def __init__(self):
         self.redis_url = settings.REDIS_URL
-        self._client: Optional[redis.Redis] = None
+        self._client: Optional[aioredis.Redis] = None
     
     @property
-    def client(self) -> redis.Redis:
-        """Connexion Redis lazy-loaded."""
+    def client(self) -> aioredis.Redis:
+        """Connexion Redis async lazy-loaded (pool partagé)."""
         if self._client is None:
-            self._client = redis.from_url(
+            self._client = aioredis.from_url(
                 self.redis_url,
-                decode_responses=True
+                decode_responses=True,
+                max_connections=64,
             )
         return self._client
     
-    def is_available(self) -> bool:
+    async def close(self):
+        """Ferme le pool de connexions Redis."""
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+    
+    async def is_available(self) -> bool:
         """Vérifie si Redis est disponible."""
         try:
-            return self.client.ping()
+            return await self.client.ping()
         except Exception as e:
             logger.warning("redis_unavailable", error=str(e))
             return False
     
-    def enqueue_workflow(
+    async def enqueue_workflow(
         self,
         execution_id: str,
         workflow_id: str,
@@ -74,7 +81,7 @@ class QueueService:
             queue_name = f"arq:queue:{priority}" if priority != "normal" else "arq:queue:default"
             
             # Format ARQ: job serialisé en JSON
-            self.client.rpush(queue_name, json.dumps(job))
+            await self.client.rpush(queue_name, json.dumps(job))
             
             logger.info(
                 "workflow_enqueued",
@@ -92,7 +99,7 @@ class QueueService:
             )
             return False
     
-    def enqueue_agent_task(
+    async def enqueue_agent_task(
         self,
         task_type: str,
         agent_id: str,
@@ -120,31 +127,48 @@ class QueueService:
         }
         
         try:
-            self.client.rpush("arq:queue:default", json.dumps(job))
+            await self.client.rpush("arq:queue:default", json.dumps(job))
             logger.info("agent_task_enqueued", job_id=job_id, task_type=task_type)
             return job_id
         except Exception as e:
             logger.error("agent_task_enqueue_failed", error=str(e))
             return None
     
-    def get_job_status(self, job_id: str) -> Optional[Dict[str, Any]]:
+    async def get_job_status(self, job_id: str) -> Optional[Dict[str, Any]]:
         """Récupère le statut d'un job."""
         try:
-            status = self.client.hget("arq:job:status", job_id)
+            status = await self.client.hget("arq:job:status", job_id)
             if status:
                 return json.loads(status)
             return None
         except Exception:
             return None
     
-    def publish_event(self, channel: str, event: Dict[str, Any]) -> bool:
+    async def publish_event(self, channel: str, event: Dict[str, Any]) -> bool:
         """Publie un événement sur un channel Redis (pub/sub)."""
         try:
-            self.client.publish(channel, json.dumps(event))
+            await self.client.publish(channel, json.dumps(event))
             return True
         except Exception as e:
             logger.error("event_publish_failed", channel=channel, error=str(e))
             return False
+    
+    async def publish_cache_invalidation(self, kind: str, entity_id: str):
+        """
+        Invalide les copies en cache d'une entité (agent, workflow) côté workers.
+        
+        Supprime les entrées Redis du cache de configs listées dans
+        `config:index:{kind}:{id}` (une par tenant qui l'utilise, templates
+        globaux compris) puis publie `cache:invalidate:{kind}:{id}` pour que
+        chaque worker vide son cache local.
+        """
+        index_key = f"config:index:{kind}:{entity_id}"
+        try:
+            stale = await self.client.smembers(index_key)
+            await self.client.delete(index_key, *stale)
+            await self.client.publish(f"cache:invalidate:{kind}:{entity_id}", "")
+        except Exception as e:
+            logger.warning("cache_invalidate_failed", kind=kind, entity_id=entity_id, error=str(e))
 
 
 # Instance singleton
@@ -0,0 +1,16 @@
+"""
+Cache module - Worker-side caches for backend data.
+"""
+from cache.configs import (
+    get_cached_config,
+    invalidate_local_configs,
+    configure_config_cache,
+    listen_for_config_invalidations,
+)
+
+__all__ = [
+    "get_cached_config",
+    "invalidate_local_configs",
+    "configure_config_cache",
+    "listen_for_config_invalidations",
+]
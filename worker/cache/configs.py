@@ -0,0 +1,128 @@
+"""
+Config Cache - Two-level cache for agent and workflow configurations.
+
+L1 is a process-local dict with a short TTL, L2 is Redis (msgpack values).
+Each entity's L2 keys (one per tenant using it) are listed in a Redis set,
+`config:index:{kind}:{id}`. When an agent or workflow changes, the backend
+deletes the keys listed there and
+publishes on `cache:invalidate:{kind}:{id}` (the convention shared by all
+worker caches) so every worker drops its L1 entries.
+"""
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import time
+import msgpack
+import structlog
+from redis.asyncio import Redis
+
+logger = structlog.get_logger()
+
+
+LOCAL_TTL = 60  # seconds
+REDIS_TTL = 300  # seconds
+INVALIDATION_PATTERNS = ("cache:invalidate:agent:*", "cache:invalidate:workflow:*")
+
+_local: Dict[Tuple[str, str, str], Tuple[Dict[str, Any], float]] = {}
+_redis: Optional[Redis] = None
+
+
+def configure_config_cache(redis: Optional[Redis]):
+    """Set the Redis connection used as L2 (ARQ's, at worker startup)."""
+    global _redis
+    _redis = redis
+
+
+def _redis_key(kind: str, tenant_id: str, entity_id: str) -> str:
+    return f"config:{kind}:{tenant_id}:{entity_id}"
+
+
+def _index_key(kind: str, entity_id: str) -> str:
+    return f"config:index:{kind}:{entity_id}"
+
+
+async def get_cached_config(
+    kind: str,
+    tenant_id: str,
+    entity_id: str,
+    loader: Callable[[], Awaitable[Optional[Dict[str, Any]]]],
+) -> Optional[Dict[str, Any]]:
+    """
+    Get a config through L1 -> Redis -> loader, filling caches on the way back.
+
+    Args:
+        kind: Config type ("agent", "workflow")
+        tenant_id: Tenant ID
+        entity_id: Agent or workflow ID
+        loader: Coroutine factory fetching the config from the source of truth
+
+    Returns:
+        Config dict, or None if the loader found nothing
+    """
+    key = (kind, tenant_id, entity_id)
+    now = time.monotonic()
+
+    entry = _local.get(key)
+    if entry is not None and entry[1] > now:
+        return entry[0]
+
+    value = None
+    redis_key = _redis_key(kind, tenant_id, entity_id)
+
+    if _redis is not None:
+        try:
+            raw = await _redis.get(redis_key)
+            if raw is not None:
+                value = msgpack.unpackb(raw)
+        except Exception as e:
+            logger.warning("Config cache read failed", key=redis_key, error=str(e))
+
+    if value is None:
+        value = await loader()
+        if value is None:
+            return None
+        if _redis is not None:
+            index_key = _index_key(kind, entity_id)
+            try:
+                async with _redis.pipeline(transaction=False) as pipe:
+                    pipe.set(redis_key, msgpack.packb(value), ex=REDIS_TTL)
+                    pipe.sadd(index_key, redis_key)
+                    pipe.expire(index_key, REDIS_TTL)
+                    await pipe.execute()
+            except Exception as e:
+                logger.warning("Config cache write failed", key=redis_key, error=str(e))
+
+    _local[key] = (value, now + LOCAL_TTL)
+    return value
+
+
+def invalidate_local_configs(kind: str, entity_id: str) -> int:
+    """
+    Drop L1 entries of an agent/workflow (for every tenant using it).
+
+    Returns:
+        Number of entries removed
+    """
+    stale = [key for key in _local if key[0] == kind and key[2] == entity_id]
+    for key in stale:
+        del _local[key]
+    return len(stale)
+
+
+async def listen_for_config_invalidations(redis: Redis):
+    """Consume `cache:invalidate:{agent|workflow}:{id}` events and drop L1 entries."""
+    pubsub = redis.pubsub()
+    await pubsub.psubscribe(*INVALIDATION_PATTERNS)
+
+    try:
+        async for message in pubsub.listen():
+            if message["type"] != "pmessage":
+                continue
+
+            channel = message["channel"]
+            if isinstance(channel, bytes):
+                channel = channel.decode()
+
+            _, _, kind, entity_id = channel.split(":", 3)
+            removed = invalidate_local_configs(kind, entity_id)
+            logger.debug("Configs invalidated", kind=kind, entity_id=entity_id, removed=removed)
+    finally:
+        await pubsub.punsubscribe(*INVALIDATION_PATTERNS)
@@ -32,10 +32,27 @@ class Settings(BaseSettings):
     MAX_JOBS: int = 10  # Concurrent jobs
     JOB_TIMEOUT: int = 300  # 5 minutes default
     HEALTH_CHECK_PORT: int = 8001
+    QUEUE_NAME: str = "agent-saas:default"
     
     # === LangGraph Settings ===
     LANGGRAPH_CHECKPOINT_NS: str = "agent-saas"
     MAX_ITERATIONS: int = 25  # Max agent iterations
+    WAIT_INLINE_MAX_SECONDS: int = 2  # Longer waits are deferred via ARQ
+    
+    # === LLM Rate Limits ===
+    # Requests per minute per worker process, shared by every job. None means
+    # unlimited: set them to your account's tier limit divided by the number
+    # of worker processes. A provider without its own value uses LLM_MAX_RPM.
+    LLM_MAX_RPM: Optional[int] = None
+    GROQ_RPM: Optional[int] = None
+    OPENAI_RPM: Optional[int] = None
+    ANTHROPIC_RPM: Optional[int] = None
+    
+    # === LLM Semantic Cache (Redis Stack) ===
+    LLM_SEMANTIC_CACHE_ENABLED: bool = False  # Availability only: steps opt in with semantic_cache
+    LLM_SEMANTIC_CACHE_THRESHOLD: float = 0.95  # Min cosine similarity for a hit (per-step override)
+    LLM_SEMANTIC_CACHE_EMBEDDING_MODEL: str = "text-embedding-3-small"
+    LLM_SEMANTIC_CACHE_DIM: int = 1536
     
     # === Retry Settings ===
     MAX_RETRIES: int = 3
@@ -5,6 +5,7 @@ from graphs.base import AgentState, create_base_graph
 from graphs.chat_agent import create_chat_agent_graph
 from graphs.workflow_agent import create_workflow_agent_graph
 from graphs.tool_agent import create_tool_agent_graph
+from graphs.registry import get_or_build_graph, invalidate_graphs
 
 __all__ = [
     "AgentState",
@@ -12,4 +13,6 @@ __all__ = [
     "create_chat_agent_graph", 
     "create_workflow_agent_graph",
     "create_tool_agent_graph",
+    "get_or_build_graph",
+    "invalidate_graphs",
 ]
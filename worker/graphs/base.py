@@ -4,9 +4,15 @@ Base Graph - Foundation for all LangGraph agents.
 from typing import TypedDict, Annotated, Sequence, List, Dict, Any, Optional
 from langgraph.graph import StateGraph, END
 from langgraph.checkpoint.memory import MemorySaver
+from langchain_core.language_models import BaseChatModel
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage
+from langchain_groq import ChatGroq
+from langchain_openai import ChatOpenAI
 import operator
 
+from config import settings
+from llm.http import get_llm_http_client
+
 
 class AgentState(TypedDict):
     """
@@ -90,6 +96,33 @@ def should_continue(state: AgentState, max_iterations: int = 25) -> str:
     return "continue"
 
 
+def create_default_llm(temperature: float = 0.7) -> Optional[BaseChatModel]:
+    """
+    Build the platform default chat model (Groq first, then OpenAI).
+    
+    Meant to be called once at graph-build time so node invocations reuse
+    the same client instead of reconstructing it on every step.
+    
+    Returns:
+        Chat model, or None if no provider key is configured
+    """
+    if settings.GROQ_API_KEY:
+        return ChatGroq(
+            api_key=settings.GROQ_API_KEY,
+            model="llama-3.3-70b-versatile",
+            temperature=temperature,
+            http_async_client=get_llm_http_client(),
+        )
+    if settings.OPENAI_API_KEY:
+        return ChatOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            model="gpt-4o-mini",
+            temperature=temperature,
+            http_async_client=get_llm_http_client(),
+        )
+    return None
+
+
 def format_messages_for_llm(
     messages: Sequence[BaseMessage],
     system_prompt: str = None,
@@ -112,9 +145,8 @@ def format_messages_for_llm(
     if system_prompt:
         formatted.append(SystemMessage(content=system_prompt))
     
-    # Take last N messages
-    recent = list(messages)[-max_messages:]
-    formatted.extend(recent)
+    # Take last N messages (slice only the tail, no full copy)
+    formatted.extend(messages[-max_messages:])
     
     return formatted
 
@@ -124,7 +156,6 @@ def create_error_response(error: str, state: AgentState) -> Dict[str, Any]:
     return {
         "error": error,
         "output": f"Désolé, une erreur s'est produite: {error}",
-        "messages": state.get("messages", []) + [
-            AIMessage(content=f"❌ Erreur: {error}")
-        ],
+        # messages uses an additive reducer: return only the new message
+        "messages": [AIMessage(content=f"❌ Erreur: {error}")],
     }
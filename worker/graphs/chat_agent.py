@@ -2,12 +2,15 @@
 Chat Agent Graph - Conversational agent with memory.
 """
 from typing import Dict, Any, Optional
+import logging
 from langgraph.graph import StateGraph, END
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 import structlog
 
 from config import settings
-from graphs.base import AgentState, initialize_node
+from graphs.base import AgentState, initialize_node, create_default_llm
+from cache.configs import get_cached_config
+from llm.cache import cached_invoke
 
 logger = structlog.get_logger()
 
@@ -16,6 +19,7 @@ async def create_chat_agent_graph(
     agent_id: str,
     tenant_id: str,
     system_prompt: str = None,
+    debug_nodes: bool = False,
 ) -> StateGraph:
     """
     Create a simple chat agent graph.
@@ -24,21 +28,32 @@ async def create_chat_agent_graph(
         agent_id: Agent ID
         tenant_id: Tenant ID
         system_prompt: Custom system prompt
+        debug_nodes: Keep separate initialize/generate/finalize nodes
+            (observability) instead of the fused single node
         
     Returns:
         Compiled chat agent graph
     """
     # Load agent config if not provided
+    deterministic = False
     if not system_prompt:
         config = await load_agent_config(agent_id, tenant_id)
         system_prompt = config.get("system_prompt", "Tu es un assistant IA helpful.")
+        deterministic = config.get("deterministic", False)
     
     # Create graph
     graph = StateGraph(AgentState)
     
+    if not debug_nodes:
+        # Fused path: one node, one state merge per turn
+        graph.add_node("chat", create_chat_step_node(system_prompt, deterministic))
+        graph.set_entry_point("chat")
+        graph.add_edge("chat", END)
+        return graph.compile()
+    
     # Add nodes
     graph.add_node("initialize", initialize_node)
-    graph.add_node("generate", create_generate_node(system_prompt))
+    graph.add_node("generate", create_generate_node(system_prompt, deterministic))
     graph.add_node("finalize", finalize_chat)
     
     # Set flow
@@ -51,7 +66,15 @@ async def create_chat_agent_graph(
 
 
 async def load_agent_config(agent_id: str, tenant_id: str) -> Dict[str, Any]:
-    """Load agent configuration."""
+    """Load agent configuration (through the config cache)."""
+    return await get_cached_config(
+        "agent", tenant_id, agent_id,
+        lambda: fetch_agent_config(agent_id, tenant_id),
+    )
+
+
+async def fetch_agent_config(agent_id: str, tenant_id: str) -> Dict[str, Any]:
+    """Fetch agent configuration from the source of truth."""
     # TODO: Load from database
     return {
         "id": agent_id,
@@ -60,52 +83,35 @@ async def load_agent_config(agent_id: str, tenant_id: str) -> Dict[str, Any]:
     }
 
 
-def create_generate_node(system_prompt: str):
+def create_generate_node(system_prompt: str, deterministic: bool = False):
     """Create the generation node with system prompt."""
+    # LLM client and system message are invariant for this graph: build once
+    llm = create_default_llm()
+    system_messages = (SystemMessage(content=system_prompt),) if system_prompt else ()
     
     async def generate_response(state: AgentState) -> Dict[str, Any]:
         """Generate chat response."""
-        from langchain_groq import ChatGroq
-        from langchain_openai import ChatOpenAI
-        
-        # Select LLM
-        if settings.GROQ_API_KEY:
-            llm = ChatGroq(
-                api_key=settings.GROQ_API_KEY,
-                model="llama-3.3-70b-versatile",
-                temperature=0.7,
-            )
-        elif settings.OPENAI_API_KEY:
-            llm = ChatOpenAI(
-                api_key=settings.OPENAI_API_KEY,
-                model="gpt-4o-mini",
-                temperature=0.7,
-            )
-        else:
+        if llm is None:
             return {
                 "error": "No LLM configured",
                 "output": "Désolé, aucun modèle LLM n'est configuré.",
             }
         
-        # Build messages
-        messages = []
-        
-        # Add system prompt
-        if system_prompt:
-            messages.append(SystemMessage(content=system_prompt))
-        
-        # Add conversation history
-        messages.extend(list(state.get("messages", [])))
+        # System prompt + conversation history, built in one pass
+        messages = [*system_messages, *state.get("messages", [])]
         
         try:
-            response = await llm.ainvoke(messages)
-            
-            logger.info(
-                "Chat response generated",
-                agent_id=state.get("agent_id"),
-                response_length=len(response.content),
+            response = await cached_invoke(
+                llm, messages, tenant_id=state.get("tenant_id"), deterministic=deterministic
             )
             
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    "Chat response generated",
+                    agent_id=state.get("agent_id"),
+                    response_length=len(response.content),
+                )
+            
             return {
                 "messages": [response],
                 "output": response.content,
@@ -121,6 +127,23 @@ def create_generate_node(system_prompt: str):
     return generate_response
 
 
+def create_chat_step_node(system_prompt: str, deterministic: bool = False):
+    """Create a single node doing initialize + generate + finalize."""
+    generate_response = create_generate_node(system_prompt, deterministic)
+    
+    async def chat_step(state: AgentState) -> Dict[str, Any]:
+        """Run one chat turn."""
+        result = await generate_response(state)
+        result.update(
+            iteration=state.get("iteration", 0) + 1,
+            tools_used=[],
+            metadata=state.get("metadata", {}),
+        )
+        return result
+    
+    return chat_step
+
+
 def finalize_chat(state: AgentState) -> Dict[str, Any]:
     """Finalize chat output."""
     return {
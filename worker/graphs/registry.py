@@ -0,0 +1,121 @@
+"""
+Graph Registry - Process-local cache of compiled LangGraph graphs.
+
+Graph compilation is a pure function of the agent/workflow configuration,
+so compiled graphs are kept per (kind, entity_id, tenant_id) and reused
+across jobs. The backend publishes on `cache:invalidate:{agent|workflow}:{id}`
+when an agent or workflow changes; a TTL and a size bound cover missed
+messages and rarely used agents.
+"""
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from collections import OrderedDict
+import asyncio
+import time
+import structlog
+from redis.asyncio import Redis
+
+from graphs.chat_agent import create_chat_agent_graph
+from graphs.tool_agent import create_tool_agent_graph
+from graphs.workflow_agent import create_workflow_agent_graph
+
+logger = structlog.get_logger()
+
+
+# Same convention as the backend client lookups: cache:invalidate:{kind}:{id}
+INVALIDATION_PATTERNS = ("cache:invalidate:agent:*", "cache:invalidate:workflow:*")
+
+GRAPH_TTL = 600  # seconds
+GRAPH_CACHE_MAX_SIZE = 256
+
+GRAPH_BUILDERS: Dict[str, Callable[[str, str], Awaitable[Any]]] = {
+    "chat_agent": create_chat_agent_graph,
+    "tool_agent": create_tool_agent_graph,
+    "workflow": create_workflow_agent_graph,
+}
+
+# (kind, entity_id, tenant_id) -> (graph, expiry), least recently used first
+_graph_cache: "OrderedDict[Tuple[str, str, str], Tuple[Any, float]]" = OrderedDict()
+_build_locks: Dict[Tuple[str, str, str], asyncio.Lock] = {}
+
+
+def _cached_graph(key: Tuple[str, str, str]) -> Optional[Any]:
+    """Cached graph if still fresh (and mark it most recently used), else None."""
+    entry = _graph_cache.get(key)
+    if entry is None:
+        return None
+    if entry[1] <= time.monotonic():
+        del _graph_cache[key]
+        return None
+    _graph_cache.move_to_end(key)
+    return entry[0]
+
+
+async def get_or_build_graph(kind: str, entity_id: str, tenant_id: str) -> Any:
+    """
+    Return the compiled graph for an agent/workflow, building it on first use.
+
+    Args:
+        kind: Graph type ("chat_agent", "tool_agent", "workflow")
+        entity_id: Agent ID or workflow ID
+        tenant_id: Tenant ID for isolation
+
+    Returns:
+        Compiled LangGraph
+    """
+    key = (kind, entity_id, tenant_id)
+
+    graph = _cached_graph(key)
+    if graph is not None:
+        return graph
+
+    # One lock per key: concurrent jobs for the same agent build it only once
+    lock = _build_locks.setdefault(key, asyncio.Lock())
+    async with lock:
+        graph = _cached_graph(key)
+        if graph is None:
+            graph = await GRAPH_BUILDERS[kind](entity_id, tenant_id)
+            _graph_cache[key] = (graph, time.monotonic() + GRAPH_TTL)
+            while len(_graph_cache) > GRAPH_CACHE_MAX_SIZE:
+                evicted, _ = _graph_cache.popitem(last=False)
+                _build_locks.pop(evicted, None)
+            logger.info("Graph compiled", kind=kind, entity_id=entity_id, tenant_id=tenant_id)
+
+    return graph
+
+
+def invalidate_graphs(entity_id: Optional[str] = None, tenant_id: Optional[str] = None) -> int:
+    """
+    Drop cached graphs matching entity_id and/or tenant_id.
+
+    Returns:
+        Number of graphs removed
+    """
+    stale = [
+        key for key in _graph_cache
+        if (entity_id is None or key[1] == entity_id)
+        and (tenant_id is None or key[2] == tenant_id)
+    ]
+    for key in stale:
+        del _graph_cache[key]
+    return len(stale)
+
+
+async def listen_for_invalidations(redis: Redis):
+    """Consume `cache:invalidate:{agent|workflow}:{id}` events and drop matching graphs."""
+    pubsub = redis.pubsub()
+    await pubsub.psubscribe(*INVALIDATION_PATTERNS)
+
+    try:
+        async for message in pubsub.listen():
+            if message["type"] != "pmessage":
+                continue
+
+            channel = message["channel"]
+            if isinstance(channel, bytes):
+                channel = channel.decode()
+
+            _, _, kind, entity_id = channel.split(":", 3)
+            removed = invalidate_graphs(entity_id)
+            logger.info("Graphs invalidated", kind=kind, entity_id=entity_id, removed=removed)
+    finally:
+        await pubsub.punsubscribe(*INVALIDATION_PATTERNS)
@@ -2,16 +2,35 @@
 Tool Agent Graph - Agent with MCP tool calling capabilities.
 """
 from typing import Dict, Any, List, Optional
+from itertools import product
+import logging
 from langgraph.graph import StateGraph, END
 from langgraph.prebuilt import ToolNode
-from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
 import structlog
 
 from config import settings
-from graphs.base import AgentState, initialize_node, should_continue, create_error_response
+from graphs.base import (
+    AgentState, initialize_node, should_continue, create_error_response, create_default_llm,
+)
+from cache.configs import get_cached_config
+from llm.rate_limit import get_llm_rate_limiter
+from tools import get_tools_for_agent
 
 logger = structlog.get_logger()
 
+_MAX_ITERATIONS = settings.MAX_ITERATIONS
+
+# (has_error, iteration_limit_reached, has_tool_calls) -> route
+_TOOL_ROUTES = {
+    (has_error, limit_reached, has_tool_calls): (
+        "error" if has_error
+        else "tools" if has_tool_calls and not limit_reached
+        else "finalize"
+    )
+    for has_error, limit_reached, has_tool_calls in product((False, True), repeat=3)
+}
+
 
 async def create_tool_agent_graph(
     agent_id: str,
@@ -29,8 +48,6 @@ async def create_tool_agent_graph(
     Returns:
         Compiled LangGraph
     """
-    from tools import get_tools_for_agent
-    
     # Load agent configuration and tools
     agent_config = await load_agent_config(agent_id, tenant_id)
     
@@ -67,7 +84,15 @@ async def create_tool_agent_graph(
 
 
 async def load_agent_config(agent_id: str, tenant_id: str) -> Dict[str, Any]:
-    """Load agent configuration from database."""
+    """Load agent configuration (through the config cache)."""
+    return await get_cached_config(
+        "agent", tenant_id, agent_id,
+        lambda: fetch_agent_config(agent_id, tenant_id),
+    )
+
+
+async def fetch_agent_config(agent_id: str, tenant_id: str) -> Dict[str, Any]:
+    """Fetch agent configuration from database."""
     # TODO: Load from database
     return {
         "id": agent_id,
@@ -79,50 +104,37 @@ async def load_agent_config(agent_id: str, tenant_id: str) -> Dict[str, Any]:
 
 def create_agent_node(agent_config: Dict[str, Any], tools: List[Any]):
     """Create the main agent reasoning node."""
+    # Client, tool binding and system message are fixed for this graph: build once
+    # Platform LLM for now: Groq (free) if configured, else OpenAI
+    llm = create_default_llm()
+    if llm is not None and tools:
+        llm = llm.bind_tools(tools)
+    
+    system_prompt = agent_config.get("system_prompt")
+    system_message = SystemMessage(content=system_prompt) if system_prompt else None
+    node_logger = logger.bind(agent_id=agent_config.get("id"))
     
     async def agent_node(state: AgentState) -> Dict[str, Any]:
         """Main agent reasoning step."""
-        from langchain_groq import ChatGroq
-        from langchain_openai import ChatOpenAI
-        
-        # Get LLM based on tenant config
-        # For now, use Groq (free)
-        if settings.GROQ_API_KEY:
-            llm = ChatGroq(
-                api_key=settings.GROQ_API_KEY,
-                model="llama-3.3-70b-versatile",
-                temperature=0.7,
-            )
-        elif settings.OPENAI_API_KEY:
-            llm = ChatOpenAI(
-                api_key=settings.OPENAI_API_KEY,
-                model="gpt-4o-mini",
-                temperature=0.7,
-            )
-        else:
+        if llm is None:
             return create_error_response("No LLM configured", state)
         
-        # Bind tools if available
-        if tools:
-            llm = llm.bind_tools(tools)
-        
-        # Build messages
-        messages = list(state.get("messages", []))
-        
-        # Add system prompt if first iteration
-        if state.get("iteration", 0) <= 1 and agent_config.get("system_prompt"):
-            from langchain_core.messages import SystemMessage
-            messages = [SystemMessage(content=agent_config["system_prompt"])] + messages
+        # Build messages in one pass (system prompt on first iteration)
+        history = state.get("messages", [])
+        if system_message is not None and state.get("iteration", 0) <= 1:
+            messages = [system_message, *history]
+        else:
+            messages = list(history)
         
         try:
             # Call LLM
-            response = await llm.ainvoke(messages)
+            response = await get_llm_rate_limiter().invoke(llm, messages)
             
-            logger.info(
-                "Agent LLM call completed",
-                agent_id=agent_config.get("id"),
-                has_tool_calls=bool(response.tool_calls) if hasattr(response, 'tool_calls') else False,
-            )
+            if node_logger.isEnabledFor(logging.INFO):
+                node_logger.info(
+                    "Agent LLM call completed",
+                    has_tool_calls=bool(getattr(response, "tool_calls", None)),
+                )
             
             return {
                 "messages": [response],
@@ -130,7 +142,7 @@ def create_agent_node(agent_config: Dict[str, Any], tools: List[Any]):
             }
             
         except Exception as e:
-            logger.error("Agent LLM call failed", error=str(e))
+            node_logger.error("Agent LLM call failed", error=str(e))
             return create_error_response(str(e), state)
     
     return agent_node
@@ -143,21 +155,11 @@ def should_use_tools(state: AgentState) -> str:
     if not messages:
         return "finalize"
     
-    last_message = messages[-1]
-    
-    # Check for errors
-    if state.get("error"):
-        return "error"
-    
-    # Check iteration limit
-    if state.get("iteration", 0) >= settings.MAX_ITERATIONS:
-        return "finalize"
-    
-    # Check if last message has tool calls
-    if hasattr(last_message, 'tool_calls') and last_message.tool_calls:
-        return "tools"
-    
-    return "finalize"
+    return _TOOL_ROUTES[(
+        bool(state.get("error")),
+        state.get("iteration", 0) >= _MAX_ITERATIONS,
+        bool(getattr(messages[-1], "tool_calls", None)),
+    )]
 
 
 async def passthrough_node(state: AgentState) -> Dict[str, Any]:
@@ -167,22 +169,16 @@ async def passthrough_node(state: AgentState) -> Dict[str, Any]:
 
 def finalize_node(state: AgentState) -> Dict[str, Any]:
     """Finalize agent output."""
-    messages = state.get("messages", [])
-    
-    # Get last AI message as output
+    # Single pass: last AI message as output + deduplicated tools used
     output = None
-    for msg in reversed(messages):
-        if isinstance(msg, AIMessage):
-            output = msg.content
-            break
-    
-    # Collect tools used
-    tools_used = state.get("tools_used", [])
-    for msg in messages:
+    tools_used = set(state.get("tools_used", []))
+    for msg in reversed(state.get("messages", [])):
         if isinstance(msg, ToolMessage):
-            tools_used.append(msg.name)
+            tools_used.add(msg.name)
+        elif output is None and isinstance(msg, AIMessage):
+            output = msg.content
     
     return {
         "output": output or "Aucune réponse générée.",
-        "tools_used": list(set(tools_used)),
+        "tools_used": list(tools_used),
     }
@@ -1,16 +1,32 @@
 """
 Workflow Agent Graph - Executes multi-step workflows.
 """
-from typing import Dict, Any, List, Optional, TypedDict, Annotated
+from typing import Dict, Any, Awaitable, Callable, List, Optional, TypedDict, Annotated
 from langgraph.graph import StateGraph, END
 from langchain_core.messages import AIMessage, HumanMessage
-import structlog
+from langchain_groq import ChatGroq
+import asyncio
 import operator
+import structlog
+import re
 
 from config import settings
+from cache.configs import get_cached_config
+from llm.cache import cached_invoke
+from llm.http import get_llm_http_client
+from templating import substitute_variables
 
 logger = structlog.get_logger()
 
+# Terminal statuses route directly; otherwise route on whether steps remain
+_STEP_STATUS_ROUTES = {"failed": "error", "completed": "complete", "paused": "complete"}
+_STEPS_DONE_ROUTES = ("next_step", "complete")
+
+_STEP_REF_RE = re.compile(r"\{step_(\d+)_output\}")
+
+# Step types with no side effects on later steps; anything else is a barrier
+_PARALLEL_STEP_TYPES = {"llm_generate"}
+
 
 class WorkflowState(TypedDict):
     """State for workflow execution."""
@@ -19,10 +35,16 @@ class WorkflowState(TypedDict):
     current_step: int
     total_steps: int
     steps: List[Dict[str, Any]]
+    step_types: List[str]  # steps[i]["type"], split out once at init
+    step_configs: List[Dict[str, Any]]  # steps[i]["config"]
     step_results: Annotated[List[Dict[str, Any]], operator.add]
+    step_levels: List[List[int]]  # step indices grouped by dependency level
+    success_count: Annotated[int, operator.add]
+    current_level: int
     input_data: Dict[str, Any]
     output_data: Dict[str, Any]
-    status: str  # pending, running, paused, completed, failed
+    status: str  # pending, running, paused, resuming, completed, failed
+    resume_after: Optional[float]  # seconds until a paused workflow resumes
     error: Optional[str]
 
 
@@ -57,7 +79,14 @@ async def create_workflow_agent_graph(
     graph.set_entry_point("initialize")
     
     # Add edges
-    graph.add_edge("initialize", "execute_step")
+    graph.add_conditional_edges(
+        "initialize",
+        route_after_init,
+        {
+            "execute": "execute_step",
+            "error": "handle_error",
+        }
+    )
     graph.add_conditional_edges(
         "execute_step",
         route_after_step,
@@ -83,7 +112,15 @@ async def create_workflow_agent_graph(
 
 
 async def load_workflow(workflow_id: str, tenant_id: str) -> Dict[str, Any]:
-    """Load workflow definition from database."""
+    """Load workflow definition (through the config cache)."""
+    return await get_cached_config(
+        "workflow", tenant_id, workflow_id,
+        lambda: fetch_workflow(workflow_id, tenant_id),
+    )
+
+
+async def fetch_workflow(workflow_id: str, tenant_id: str) -> Dict[str, Any]:
+    """Fetch workflow definition from database."""
     # TODO: Load from database via backend API
     return {
         "id": workflow_id,
@@ -92,8 +129,60 @@ async def load_workflow(workflow_id: str, tenant_id: str) -> Dict[str, Any]:
     }
 
 
+def compute_step_levels(steps: List[Dict[str, Any]]) -> List[List[int]]:
+    """
+    Group steps into dependency levels that can run concurrently.
+    
+    A step depends on the steps listed in its `depends_on` and on every
+    `{step_N_output}` its prompt references. Steps that are not pure LLM
+    generation (tool calls, waits, approvals, conditions) act as barriers,
+    so a chain-style workflow yields one step per level.
+    """
+    step_level: List[int] = []
+    barrier = -1
+    
+    for index, step in enumerate(steps):
+        deps = {int(d) for d in step.get("depends_on") or []}
+        deps.update(int(n) for n in _STEP_REF_RE.findall(step.get("config", {}).get("prompt", "")))
+        
+        level = max((step_level[d] + 1 for d in deps if 0 <= d < index), default=0)
+        level = max(level, barrier + 1)
+        
+        if step.get("type") not in _PARALLEL_STEP_TYPES:
+            level = max(level, max(step_level, default=-1) + 1)
+            barrier = level
+        
+        step_level.append(level)
+    
+    levels: List[List[int]] = [[] for _ in range(max(step_level, default=-1) + 1)]
+    for index, level in enumerate(step_level):
+        levels[level].append(index)
+    return levels
+
+
 def initialize_workflow(state: WorkflowState) -> Dict[str, Any]:
     """Initialize workflow execution state."""
+    steps = state.get("steps", [])
+    step_types = [step.get("type") for step in steps]
+    step_configs = [step.get("config", {}) for step in steps]
+    
+    # Reject unknown step types before running anything
+    unknown = set(step_types) - _STEP_HANDLERS.keys()
+    if unknown:
+        error = f"Unknown step type: {', '.join(sorted(map(str, unknown)))}"
+        logger.error("Invalid workflow", workflow_id=state.get("workflow_id"), error=error)
+        return {"status": "failed", "error": error}
+    
+    if state.get("status") == "resuming":
+        # Resumed after a deferred wait: keep levels and progress from the snapshot
+        logger.info("Resuming workflow", workflow_id=state.get("workflow_id"))
+        return {
+            "step_types": step_types,
+            "step_configs": step_configs,
+            "status": "running",
+            "resume_after": None,
+        }
+    
     logger.info(
         "Initializing workflow",
         workflow_id=state.get("workflow_id"),
@@ -101,7 +190,11 @@ def initialize_workflow(state: WorkflowState) -> Dict[str, Any]:
     )
     
     return {
+        "step_types": step_types,
+        "step_configs": step_configs,
         "current_step": 0,
+        "current_level": 0,
+        "step_levels": compute_step_levels(steps),
         "status": "running",
         "step_results": [],
         "output_data": {},
@@ -109,103 +202,109 @@ def initialize_workflow(state: WorkflowState) -> Dict[str, Any]:
 
 
 async def execute_workflow_step(state: WorkflowState) -> Dict[str, Any]:
-    """Execute current workflow step."""
-    steps = state.get("steps", [])
-    current_step = state.get("current_step", 0)
+    """Execute the current level of independent workflow steps concurrently."""
+    levels = state.get("step_levels", [])
+    current_level = state.get("current_level", 0)
     
-    if current_step >= len(steps):
+    if current_level >= len(levels):
         return {"status": "completed"}
     
-    step = steps[current_step]
-    step_type = step.get("type")
+    indices = levels[current_level]
+    
+    # Results stay in step_index order within a level
+    step_results = await asyncio.gather(*(
+        run_step(index, state) for index in indices
+    ))
+    
+    update: Dict[str, Any] = {
+        "step_results": list(step_results),
+        "current_level": current_level + 1,
+        "current_step": state.get("current_step", 0) + len(indices),
+    }
+    
+    update["success_count"] = sum(1 for r in step_results if r["status"] == "success")
+    
+    failed = next((r for r in step_results if r["status"] == "failed"), None)
+    if failed:
+        update["status"] = "failed"
+        update["error"] = failed["error"]
+        return update
+    
+    # Long waits pause the workflow; the task layer re-enqueues it later
+    resume_after = max(
+        (
+            r["output"]["resume_after"] for r in step_results
+            if isinstance(r.get("output"), dict) and r["output"].get("resume_after")
+        ),
+        default=0,
+    )
+    if resume_after:
+        update["status"] = "paused"
+        update["resume_after"] = resume_after
+    
+    return update
+
+
+async def run_step(index: int, state: WorkflowState) -> Dict[str, Any]:
+    """Execute one step and wrap its outcome as a step result."""
+    step_type = state["step_types"][index]
     
     logger.info(
         "Executing workflow step",
         workflow_id=state.get("workflow_id"),
-        step_index=current_step,
+        step_index=index,
         step_type=step_type,
     )
     
     try:
-        result = await execute_step_by_type(step, state)
+        handler = _STEP_HANDLERS[step_type]
+        result = await handler(state["step_configs"][index], state)
         
         return {
-            "step_results": [{
-                "step_index": current_step,
-                "step_type": step_type,
-                "status": "success",
-                "output": result,
-            }],
-            "current_step": current_step + 1,
+            "step_index": index,
+            "step_type": step_type,
+            "status": "success",
+            "output": result,
         }
         
     except Exception as e:
         logger.error(
             "Workflow step failed",
-            step_index=current_step,
+            step_index=index,
             error=str(e),
         )
         return {
-            "step_results": [{
-                "step_index": current_step,
-                "step_type": step_type,
-                "status": "failed",
-                "error": str(e),
-            }],
+            "step_index": index,
+            "step_type": step_type,
             "status": "failed",
             "error": str(e),
         }
 
 
-async def execute_step_by_type(step: Dict[str, Any], state: WorkflowState) -> Any:
-    """Execute a step based on its type."""
-    step_type = step.get("type")
-    config = step.get("config", {})
-    
-    if step_type == "llm_generate":
-        return await execute_llm_step(config, state)
-    
-    elif step_type == "tool_call":
-        return await execute_tool_step(config, state)
-    
-    elif step_type == "condition":
-        return await execute_condition_step(config, state)
-    
-    elif step_type == "wait":
-        return await execute_wait_step(config, state)
-    
-    elif step_type == "human_approval":
-        return await execute_human_approval_step(config, state)
-    
-    else:
-        raise ValueError(f"Unknown step type: {step_type}")
-
-
 async def execute_llm_step(config: Dict[str, Any], state: WorkflowState) -> str:
     """Execute an LLM generation step."""
-    from langchain_groq import ChatGroq
-    
-    prompt = config.get("prompt", "")
-    
-    # Replace variables in prompt
-    input_data = state.get("input_data", {})
-    for key, value in input_data.items():
-        prompt = prompt.replace(f"{{{key}}}", str(value))
+    template = config.get("prompt", "")
     
-    # Also use previous step outputs
+    # Input data + previous step outputs, substituted in a single pass
+    variables = dict(state.get("input_data", {}))
     for result in state.get("step_results", []):
         if result.get("status") == "success":
-            prompt = prompt.replace(
-                f"{{step_{result['step_index']}_output}}",
-                str(result.get("output", ""))
-            )
+            variables[f"step_{result['step_index']}_output"] = result.get("output", "")
+    
+    prompt = substitute_variables(template, variables)
     
     llm = ChatGroq(
         api_key=settings.GROQ_API_KEY,
         model="llama-3.3-70b-versatile",
+        http_async_client=get_llm_http_client(),
     )
     
-    response = await llm.ainvoke([HumanMessage(content=prompt)])
+    response = await cached_invoke(
+        llm,
+        [HumanMessage(content=prompt)],
+        tenant_id=state.get("tenant_id"),
+        deterministic=config.get("deterministic", False),
+    )
     return response.content
 
 
@@ -229,13 +328,18 @@ async def execute_condition_step(config: Dict[str, Any], state: WorkflowState) -
 
 
 async def execute_wait_step(config: Dict[str, Any], state: WorkflowState) -> Dict:
-    """Execute a wait/delay step."""
-    import asyncio
+    """
+    Execute a wait/delay step.
     
+    Short waits sleep inline; longer ones pause the workflow so the job
+    slot is released while waiting (see `run_workflow`).
+    """
     duration = config.get("duration_seconds", 1)
-    await asyncio.sleep(min(duration, 60))  # Max 60s wait
+    if duration <= settings.WAIT_INLINE_MAX_SECONDS:
+        await asyncio.sleep(duration)
+        return {"waited": duration}
     
-    return {"waited": duration}
+    return {"waited": duration, "resume_after": duration}
 
 
 async def execute_human_approval_step(config: Dict[str, Any], state: WorkflowState) -> Dict:
@@ -247,21 +351,28 @@ async def execute_human_approval_step(config: Dict[str, Any], state: WorkflowSta
     }
 
 
+# Step type -> handler(config, state); types are validated against it at init
+_STEP_HANDLERS: Dict[str, Callable[[Dict[str, Any], WorkflowState], Awaitable[Any]]] = {
+    "llm_generate": execute_llm_step,
+    "tool_call": execute_tool_step,
+    "condition": execute_condition_step,
+    "wait": execute_wait_step,
+    "human_approval": execute_human_approval_step,
+}
+
+
+def route_after_init(state: WorkflowState) -> str:
+    """Route to error handling if the workflow failed validation."""
+    return "error" if state.get("status") == "failed" else "execute"
+
+
 def route_after_step(state: WorkflowState) -> str:
     """Route after step execution."""
-    if state.get("status") == "failed":
-        return "error"
-    
-    if state.get("status") == "completed":
-        return "complete"
-    
-    current_step = state.get("current_step", 0)
-    total_steps = len(state.get("steps", []))
-    
-    if current_step >= total_steps:
-        return "complete"
+    route = _STEP_STATUS_ROUTES.get(state.get("status"))
+    if route is not None:
+        return route
     
-    return "next_step"
+    return _STEPS_DONE_ROUTES[state.get("current_step", 0) >= len(state.get("steps", []))]
 
 
 def route_after_condition(state: WorkflowState) -> str:
@@ -305,7 +416,7 @@ def finalize_workflow(state: WorkflowState) -> Dict[str, Any]:
         "Workflow finalized",
         workflow_id=state.get("workflow_id"),
         status=state.get("status"),
-        steps_completed=len([r for r in step_results if r.get("status") == "success"]),
+        steps_completed=state.get("success_count", 0),
     )
     
     return {
@@ -0,0 +1,19 @@
+"""
+LLM module - Shared LLM call plumbing for graphs and tasks.
+"""
+from llm.rate_limit import RateLimitedLLMClient, get_llm_rate_limiter
+from llm.cache import cached_invoke, configure_llm_cache
+from llm.http import get_llm_http_client, close_llm_http_client
+from llm.semantic_cache import configure_semantic_cache, semantic_lookup, semantic_store
+
+__all__ = [
+    "RateLimitedLLMClient",
+    "get_llm_rate_limiter",
+    "cached_invoke",
+    "configure_llm_cache",
+    "get_llm_http_client",
+    "close_llm_http_client",
+    "configure_semantic_cache",
+    "semantic_lookup",
+    "semantic_store",
+]
@@ -0,0 +1,99 @@
+"""
+LLM Cache - Exact-match response cache in Redis.
+
+Keyed on (tenant, provider, model, temperature, messages), so tenants
+never share entries. Only deterministic calls are cached: temperature 0,
+or an explicit `deterministic=True` from the step or agent config.
+"""
+from typing import Any, Optional, Sequence
+from hashlib import blake2b
+import orjson
+from langchain_core.messages import AIMessage, BaseMessage
+from redis.asyncio import Redis
+import structlog
+
+from llm.rate_limit import get_llm_rate_limiter
+
+logger = structlog.get_logger()
+
+
+CACHE_KEY_PREFIX = "llm:"
+
+_redis: Optional[Redis] = None
+
+
+def configure_llm_cache(redis: Optional[Redis]):
+    """Set the Redis connection used by the cache (ARQ's, at worker startup)."""
+    global _redis
+    _redis = redis
+
+
+def _cache_key(
+    tenant_id: str,
+    provider: str,
+    model: str,
+    temperature: Any,
+    messages: Sequence[BaseMessage],
+) -> str:
+    payload = orjson.dumps(
+        [tenant_id, provider, model, temperature, [(m.type, m.content) for m in messages]],
+        option=orjson.OPT_SORT_KEYS,
+        default=str,
+    )
+    return CACHE_KEY_PREFIX + blake2b(payload, digest_size=16).hexdigest()
+
+
+async def cached_invoke(
+    llm: Any,
+    messages: Sequence[BaseMessage],
+    *,
+    tenant_id: Optional[str],
+    ttl: int = 3600,
+    deterministic: bool = False,
+) -> BaseMessage:
+    """
+    Invoke the LLM, serving repeated identical requests from Redis.
+
+    Args:
+        llm: LangChain chat model
+        messages: Prompt messages
+        tenant_id: Tenant owning the call (no caching without one)
+        ttl: Cache TTL in seconds
+        deterministic: Cache even when temperature > 0
+
+    Returns:
+        AI response message
+    """
+    temperature = getattr(llm, "temperature", None)
+    cacheable = deterministic or not temperature
+    if _redis is None or not cacheable or not tenant_id:
+        return await get_llm_rate_limiter().invoke(llm, messages)
+
+    model = getattr(llm, "model_name", None) or getattr(llm, "model", "")
+    key = _cache_key(tenant_id, type(llm).__name__, model, temperature, messages)
+
+    try:
+        cached = await _redis.get(key)
+    except Exception as e:
+        logger.warning("LLM cache read failed", error=str(e))
+        cached = None
+
+    if cached is not None:
+        data = orjson.loads(cached)
+        return AIMessage(content=data["content"], tool_calls=data.get("tool_calls", []))
+
+    response = await get_llm_rate_limiter().invoke(llm, messages)
+
+    try:
+        await _redis.set(
+            key,
+            orjson.dumps({
+                "content": response.content,
+                "tool_calls": getattr(response, "tool_calls", []),
+            }),
+            ex=ttl,
+        )
+    except Exception as e:
+        logger.warning("LLM cache write failed", error=str(e))
+
+    return response
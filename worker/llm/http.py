@@ -0,0 +1,32 @@
+"""
+LLM HTTP - Shared connection pool for outbound LLM provider calls.
+
+ChatGroq / ChatOpenAI each create their own httpx client by default;
+passing this one as `http_async_client` lets every model instance reuse
+the same keep-alive (HTTP/2) connections.
+"""
+from typing import Optional
+import httpx
+
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_llm_http_client() -> httpx.AsyncClient:
+    """Get or create the shared LLM HTTP client."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=200, max_keepalive_connections=100),
+            timeout=60.0,
+        )
+    return _http_client
+
+
+async def close_llm_http_client():
+    """Close the shared LLM HTTP client."""
+    global _http_client
+    if _http_client is not None and not _http_client.is_closed:
+        await _http_client.aclose()
+    _http_client = None
@@ -0,0 +1,74 @@
+"""
+LLM Rate Limit - Shared per-provider rate limiting for LLM calls.
+
+Every LLM call in the worker goes through `invoke`, which waits for a
+token from the provider's requests-per-minute limiter (shared by every
+task) and then calls the model directly. Providers without a configured
+limit are not throttled.
+"""
+from typing import Any, Dict, Optional, Sequence
+from aiolimiter import AsyncLimiter
+from langchain_core.messages import BaseMessage
+
+from config import settings
+
+
+class RateLimitedLLMClient:
+    """
+    Process-wide rate-limited entry point in front of `llm.ainvoke`.
+
+    Usage:
+        response = await get_llm_rate_limiter().invoke(llm, messages)
+    """
+
+    def __init__(
+        self,
+        rpm: Optional[int] = None,
+        provider_rpm: Optional[Dict[str, Optional[int]]] = None,
+    ):
+        self.default_rpm = rpm
+        self.provider_rpm = {
+            provider: limit for provider, limit in (provider_rpm or {}).items() if limit
+        }
+        self.limiters: Dict[str, AsyncLimiter] = {}
+
+    async def invoke(self, llm: Any, messages: Sequence[BaseMessage]) -> BaseMessage:
+        """Wait for the provider's rate limit (if any), then call the model."""
+        limiter = self.limiter_for(llm)
+        if limiter is None:
+            return await llm.ainvoke(messages)
+        async with limiter:
+            return await llm.ainvoke(messages)
+
+    def limiter_for(self, llm: Any) -> Optional[AsyncLimiter]:
+        """Rate limiter for the provider behind a model (or tool-bound model), None if unlimited."""
+        model = getattr(llm, "bound", llm)
+        # langchain_groq.chat_models -> "groq"
+        provider = type(model).__module__.split(".")[0].removeprefix("langchain_")
+
+        limiter = self.limiters.get(provider)
+        if limiter is None:
+            rpm = self.provider_rpm.get(provider, self.default_rpm)
+            if not rpm:
+                return None
+            limiter = self.limiters[provider] = AsyncLimiter(rpm, 60)
+        return limiter
+
+
+# Singleton instance
+_llm_rate_limiter: Optional[RateLimitedLLMClient] = None
+
+
+def get_llm_rate_limiter() -> RateLimitedLLMClient:
+    """Get or create the LLM rate limiter singleton."""
+    global _llm_rate_limiter
+    if _llm_rate_limiter is None:
+        _llm_rate_limiter = RateLimitedLLMClient(
+            rpm=settings.LLM_MAX_RPM,
+            provider_rpm={
+                "groq": settings.GROQ_RPM,
+                "openai": settings.OPENAI_RPM,
+                "anthropic": settings.ANTHROPIC_RPM,
+            },
+        )
+    return _llm_rate_limiter
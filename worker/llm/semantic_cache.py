@@ -0,0 +1,167 @@
+"""
+LLM Semantic Cache - Near-duplicate prompt cache on Redis vector search.
+
+Sits in front of the exact-match cache for workflow LLM steps: the prompt
+is embedded and the closest cached prompt in the same scope (tenant,
+model, temperature) is returned when its cosine similarity clears the
+threshold. Only steps with `semantic_cache: true` in their config use it.
+Requires Redis Stack (RediSearch); disabled by default and turned off for
+the process if the index cannot be created.
+"""
+from typing import List, Optional, Tuple
+from array import array
+from hashlib import blake2b
+import structlog
+from redis.asyncio import Redis
+from redis.commands.search.field import TagField, TextField, VectorField
+try:
+    from redis.commands.search.index_definition import IndexDefinition, IndexType
+except ImportError:  # redis-py < 6
+    from redis.commands.search.indexDefinition import IndexDefinition, IndexType
+from redis.commands.search.query import Query
+
+from config import settings
+from llm.http import get_llm_http_client
+
+logger = structlog.get_logger()
+
+
+INDEX_NAME = "idx:llm_semantic"
+KEY_PREFIX = "llmsem:"
+
+_redis: Optional[Redis] = None
+_embeddings = None
+_index_ready = False
+
+
+def configure_semantic_cache(redis: Optional[Redis]):
+    """Set the Redis connection used by the cache (ARQ's, at worker startup)."""
+    global _redis
+    _redis = redis if settings.LLM_SEMANTIC_CACHE_ENABLED else None
+
+
+def cache_scope(tenant_id: Optional[str], model: str, temperature: float, prefix: str = "") -> str:
+    """Tag isolating entries per tenant, model settings and static prompt prefix."""
+    raw = f"{tenant_id or ''}:{model}:{temperature}:{prefix}".encode()
+    return blake2b(raw, digest_size=8).hexdigest()
+
+
+def _get_embeddings():
+    global _embeddings
+    if _embeddings is None:
+        from langchain_openai import OpenAIEmbeddings
+
+        _embeddings = OpenAIEmbeddings(
+            api_key=settings.OPENAI_API_KEY,
+            model=settings.LLM_SEMANTIC_CACHE_EMBEDDING_MODEL,
+            http_async_client=get_llm_http_client(),
+        )
+    return _embeddings
+
+
+async def _ensure_index() -> bool:
+    """Create the vector index once; disable the cache if RediSearch is missing."""
+    global _redis, _index_ready
+    if _index_ready:
+        return True
+
+    index = _redis.ft(INDEX_NAME)
+    try:
+        await index.info()
+    except Exception:
+        try:
+            await index.create_index(
+                [
+                    TagField("scope"),
+                    TextField("response", no_index=True),
+                    VectorField(
+                        "embedding",
+                        "HNSW",
+                        {
+                            "TYPE": "FLOAT32",
+                            "DIM": settings.LLM_SEMANTIC_CACHE_DIM,
+                            "DISTANCE_METRIC": "COSINE",
+                        },
+                    ),
+                ],
+                definition=IndexDefinition(prefix=[KEY_PREFIX], index_type=IndexType.HASH),
+            )
+        except Exception as e:
+            if "Index already exists" not in str(e):
+                logger.warning("Semantic cache disabled", error=str(e))
+                _redis = None
+                return False
+
+    _index_ready = True
+    return True
+
+
+async def semantic_lookup(
+    scope: str,
+    prompt: str,
+    threshold: Optional[float] = None,
+) -> Tuple[Optional[str], Optional[List[float]]]:
+    """
+    Find a cached response for a similar prompt.
+
+    Args:
+        scope: Tag from cache_scope
+        prompt: Variable part of the prompt
+        threshold: Min cosine similarity (default LLM_SEMANTIC_CACHE_THRESHOLD)
+
+    Returns:
+        (cached response or None, prompt embedding to reuse for semantic_store)
+    """
+    if _redis is None or not await _ensure_index():
+        return None, None
+
+    try:
+        embedding = await _get_embeddings().aembed_query(prompt)
+        query = (
+            Query(f"(@scope:{{{scope}}})=>[KNN 1 @embedding $vec AS distance]")
+            .sort_by("distance")
+            .return_fields("response", "distance")
+            .dialect(2)
+        )
+        result = await _redis.ft(INDEX_NAME).search(
+            query, query_params={"vec": array("f", embedding).tobytes()}
+        )
+    except Exception as e:
+        logger.warning("Semantic cache lookup failed", error=str(e))
+        return None, None
+
+    if result.docs:
+        doc = result.docs[0]
+        # COSINE distance = 1 - similarity
+        if threshold is None:
+            threshold = settings.LLM_SEMANTIC_CACHE_THRESHOLD
+        if 1 - float(doc.distance) >= threshold:
+            response = doc.response
+            return response.decode() if isinstance(response, bytes) else response, embedding
+
+    return None, embedding
+
+
+async def semantic_store(
+    scope: str,
+    prompt: str,
+    embedding: Optional[List[float]],
+    response: str,
+    ttl: int = 3600,
+):
+    """Cache a response under the prompt embedding from semantic_lookup."""
+    if _redis is None or embedding is None:
+        return
+
+    key = KEY_PREFIX + blake2b(f"{scope}:{prompt}".encode(), digest_size=16).hexdigest()
+    try:
+        async with _redis.pipeline(transaction=False) as pipe:
+            pipe.hset(key, mapping={
+                "scope": scope,
+                "response": response,
+                "embedding": array("f", embedding).tobytes(),
+            })
+            pipe.expire(key, ttl)
+            await pipe.execute()
+    except Exception as e:
+        logger.warning("Semantic cache write failed", error=str(e))
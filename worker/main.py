@@ -5,10 +5,17 @@ import asyncio
 from typing import Any, Dict
 from arq import cron, create_pool
 from arq.connections import RedisSettings
+import orjson
 import structlog
 
 from config import settings
 
+
+def _orjson_dumps(value: Any, **kwargs) -> str:
+    """structlog serializer: orjson, decoded for the stdlib logger factory."""
+    return orjson.dumps(value, default=kwargs.get("default")).decode()
+
+
 # Configure structured logging
 structlog.configure(
     processors=[
@@ -20,7 +27,7 @@ structlog.configure(
         structlog.processors.StackInfoRenderer(),
         structlog.processors.format_exc_info,
         structlog.processors.UnicodeDecoder(),
-        structlog.processors.JSONRenderer()
+        structlog.processors.JSONRenderer(serializer=_orjson_dumps)
     ],
     wrapper_class=structlog.stdlib.BoundLogger,
     context_class=dict,
@@ -94,6 +101,41 @@ async def execute_workflow(
         }
 
 
+async def resume_workflow(
+    ctx: Dict[str, Any],
+    workflow_id: str,
+    tenant_id: str,
+    execution_id: str,
+    input_data: Dict[str, Any],
+    resume_state: Dict[str, Any],
+) -> Dict[str, Any]:
+    """
+    Continue a workflow paused on a long wait step.
+    
+    Enqueued by `run_workflow` with `_defer_by` set to the wait duration.
+    """
+    from tasks.workflow_tasks import run_workflow
+    
+    logger.info("Resuming workflow execution", workflow_id=workflow_id, execution_id=execution_id)
+    
+    try:
+        return await run_workflow(
+            workflow_id=workflow_id,
+            tenant_id=tenant_id,
+            input_data=input_data,
+            redis=ctx["redis"],
+            execution_id=execution_id,
+            resume_state=resume_state,
+        )
+    except Exception as e:
+        logger.error("Workflow resume failed", workflow_id=workflow_id, error=str(e))
+        return {
+            "status": "failed",
+            "error": str(e),
+            "workflow_id": workflow_id,
+        }
+
+
 async def execute_agent_task(
     ctx: Dict[str, Any],
     agent_id: str,
@@ -116,7 +158,7 @@ async def execute_agent_task(
     Returns:
         Agent response with content and metadata
     """
-    from graphs.tool_agent import create_tool_agent_graph
+    from graphs.registry import get_or_build_graph
     
     logger.info(
         "Starting agent task",
@@ -126,11 +168,8 @@ async def execute_agent_task(
     )
     
     try:
-        # Create agent graph
-        graph = await create_tool_agent_graph(
-            agent_id=agent_id,
-            tenant_id=tenant_id,
-        )
+        # Get compiled agent graph (cached per agent/tenant)
+        graph = await get_or_build_graph("tool_agent", agent_id, tenant_id)
         
         # Execute
         result = await graph.ainvoke({
@@ -215,7 +254,18 @@ async def cleanup_old_executions(ctx: Dict[str, Any]):
 
 async def startup(ctx: Dict[str, Any]):
     """Worker startup hook."""
-    from services.backend_client import get_backend_client
+    from services.backend_client import get_backend_client, listen_for_lookup_invalidations
+    from graphs.registry import listen_for_invalidations
+    from llm.cache import configure_llm_cache
+    from llm.semantic_cache import configure_semantic_cache
+    from llm.http import get_llm_http_client
+    from llm.rate_limit import get_llm_rate_limiter
+    from cache.configs import configure_config_cache, listen_for_config_invalidations
+    from redis.utils import HIREDIS_AVAILABLE
+    # Task modules pull in LangChain + provider SDKs: pay the import cost
+    # here, before the first job, rather than on it
+    import tasks.workflow_tasks  # noqa: F401
+    import tasks.scheduled_tasks  # noqa: F401
     
     logger.info(
         "Worker starting",
@@ -224,7 +274,10 @@ async def startup(ctx: Dict[str, Any]):
         environment=settings.ENVIRONMENT,
         max_jobs=settings.MAX_JOBS,
         backend_url=settings.BACKEND_URL,
+        hiredis=HIREDIS_AVAILABLE,
     )
+    if not HIREDIS_AVAILABLE:
+        logger.warning("hiredis not installed - Redis replies parsed in pure Python")
     
     # Verify backend connectivity
     client = get_backend_client()
@@ -240,15 +293,69 @@ async def startup(ctx: Dict[str, Any]):
     
     # Store client in context for tasks
     ctx["backend_client"] = client
+    
+    # Drop cached agent / prompt / LLM config lookups on backend updates
+    ctx["lookup_invalidation_task"] = asyncio.create_task(
+        listen_for_lookup_invalidations(ctx["redis"])
+    )
+    
+    # Shared connection pool for all LLM provider clients
+    ctx["http_client"] = get_llm_http_client()
+    
+    # Per-provider RPM limiters shared by every task (via the LLM rate limiter)
+    ctx["rate_limiters"] = get_llm_rate_limiter().limiters
+    
+    # Exact-match + semantic (opt-in) LLM caches share ARQ's Redis connection
+    configure_llm_cache(ctx["redis"])
+    configure_semantic_cache(ctx["redis"])
+    
+    # Agent/workflow config cache: Redis as L2, pub/sub to drop local entries
+    configure_config_cache(ctx["redis"])
+    ctx["config_invalidation_task"] = asyncio.create_task(
+        listen_for_config_invalidations(ctx["redis"])
+    )
+    
+    # Drop cached graphs when agent/workflow config changes
+    ctx["graph_invalidation_task"] = asyncio.create_task(
+        listen_for_invalidations(ctx["redis"])
+    )
 
 
 async def shutdown(ctx: Dict[str, Any]):
     """Worker shutdown hook."""
+    from llm.http import close_llm_http_client
+    from tools.base import drain_background_tools
+    from tools.http import close_tool_http_client
+    from tools.smtp import close_smtp_sessions
+    from tasks.scheduled_tasks import close_arq_pool
+    from tasks.workflow_tasks import drain_background_tasks
+    
     logger.info("Worker shutting down")
     
+    for task_key in ("graph_invalidation_task", "config_invalidation_task", "lookup_invalidation_task"):
+        if task_key in ctx:
+            ctx[task_key].cancel()
+    
+    # Let in-flight completion notifications reach the backend
+    await drain_background_tasks()
+    
     # Close backend client
     if "backend_client" in ctx:
         await ctx["backend_client"].close()
+    
+    # Close shared LLM connection pool
+    await close_llm_http_client()
+    
+    # Let queued fire-and-forget tool calls (await_response=False) go out
+    # before their connections are closed
+    await drain_background_tools()
+    
+    # Close shared tools connection pool
+    await close_tool_http_client()
+    await close_smtp_sessions()
+    
+    # Close the pool used by scheduled tasks to enqueue workflows
+    await close_arq_pool()
 
 
 # ============================================================
@@ -264,6 +371,7 @@ class WorkerSettings:
     # Available functions (tasks)
     functions = [
         execute_workflow,
+        resume_workflow,
         execute_agent_task,
         send_scheduled_email,
     ]
@@ -287,7 +395,7 @@ class WorkerSettings:
     health_check_interval = 30
     
     # Queue names
-    queue_name = "agent-saas:default"
+    queue_name = settings.QUEUE_NAME
 
 
 # ============================================================
@@ -318,8 +426,7 @@ async def health_server():
 
 if __name__ == "__main__":
     # Run health server in background when running directly
-    loop = asyncio.get_event_loop()
-    loop.run_until_complete(health_server())
+    asyncio.run(health_server())
     
     # The actual worker is started by: arq main.WorkerSettings
     print(f"Worker settings configured. Run with: arq main.WorkerSettings")
@@ -2,15 +2,41 @@
 Backend Client - Communication avec l'API Backend.
 Permet au worker de récupérer les workflows et mettre à jour les statuts.
 """
+import asyncio
+import time
+import weakref
 import httpx
-from typing import Any, Dict, List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import orjson
 import structlog
+from redis.asyncio import Redis
+from tenacity import (
+    retry,
+    retry_if_exception_type,
+    retry_if_result,
+    stop_after_attempt,
+    wait_exponential_jitter,
+)
 
 from config import settings
 
 logger = structlog.get_logger()
 
 
+# Cache local des lookups agent / prompt / config LLM (process-local : les
+# configs LLM contiennent des clés API, elles ne vont pas dans Redis)
+LOOKUP_TTL = 60  # seconds
+# Invalidés par pub/sub à chaque mise à jour : le TTL ne borne que les pertes de message
+LOOKUP_TTLS = {"llm_config": 300}
+LOOKUP_MAX_SIZE = 1024
+# Le backend publie sur `cache:invalidate:{kind}:{id}` lors d'une mise à jour
+LOOKUP_INVALIDATION_PATTERN = "cache:invalidate:*"
+
+
+def _is_server_error(response: httpx.Response) -> bool:
+    return response.status_code >= 500
+
+
 class BackendClient:
     """Client HTTP pour communiquer avec le Backend API."""
     
@@ -18,10 +44,12 @@ class BackendClient:
         self.base_url = settings.BACKEND_URL.rstrip("/")
         self.api_key = settings.BACKEND_API_KEY
         self._client: Optional[httpx.AsyncClient] = None
+        self._headers = self._build_headers()
+        self._lookups: Dict[Tuple[str, str], Tuple[Dict[str, Any], float]] = {}
+        self._pending_lookups: Dict[Tuple[str, str], asyncio.Future] = {}
     
-    @property
-    def headers(self) -> Dict[str, str]:
-        """Headers pour les requêtes API."""
+    def _build_headers(self) -> Dict[str, str]:
+        """Construit les headers (une seule fois, settings fixes)."""
         headers = {
             "Content-Type": "application/json",
             "User-Agent": f"agent-saas-worker/{settings.VERSION}"
@@ -30,13 +58,28 @@ class BackendClient:
             headers["Authorization"] = f"Bearer {self.api_key}"
         return headers
     
+    @property
+    def headers(self) -> Dict[str, str]:
+        """Headers pour les requêtes API."""
+        return self._headers
+    
     async def get_client(self) -> httpx.AsyncClient:
-        """Lazy-load async HTTP client."""
+        """Lazy-load async HTTP client (keep-alive pool; plain http://, so HTTP/1.1)."""
         if self._client is None or self._client.is_closed:
+            # Le transport retente les échecs de connexion (sûr pour toutes les méthodes)
+            transport = httpx.AsyncHTTPTransport(
+                retries=3,
+                limits=httpx.Limits(
+                    max_connections=50,
+                    max_keepalive_connections=50,
+                    keepalive_expiry=60,
+                ),
+            )
             self._client = httpx.AsyncClient(
                 base_url=self.base_url,
-                headers=self.headers,
-                timeout=30.0
+                headers=self._headers,
+                transport=transport,
+                timeout=httpx.Timeout(30.0, connect=5.0),
             )
         return self._client
     
@@ -46,13 +89,70 @@ class BackendClient:
             await self._client.aclose()
             self._client = None
     
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential_jitter(initial=0.1, max=2.0),
+        retry=retry_if_exception_type(httpx.RequestError) | retry_if_result(_is_server_error),
+        # Après le dernier essai : relève l'exception ou renvoie la dernière réponse
+        retry_error_callback=lambda state: state.outcome.result(),
+    )
+    async def _get(self, url: str, **kwargs) -> httpx.Response:
+        """GET idempotent, retenté sur erreur réseau ou 5xx."""
+        client = await self.get_client()
+        return await client.get(url, **kwargs)
+    
+    async def _patch_json(self, url: str, payload: Dict[str, Any]) -> httpx.Response:
+        """PATCH avec un corps pré-sérialisé en orjson (Content-Type déjà dans les headers)."""
+        client = await self.get_client()
+        return await client.patch(url, content=orjson.dumps(payload))
+    
+    # === Lookup Cache ===
+    
+    async def _cached_lookup(
+        self,
+        kind: str,
+        key: str,
+        fetch: Callable[[], Awaitable[Optional[Dict[str, Any]]]]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Sert un lookup depuis le cache local (TTL), sinon appelle `fetch`.
+        
+        Les appels concurrents sur une même clé froide (steps parallèles d'un
+        workflow) partagent un seul `fetch`.
+        """
+        lookup_key = (kind, key)
+        entry = self._lookups.get(lookup_key)
+        if entry is not None and entry[1] > time.monotonic():
+            return entry[0]
+        
+        pending = self._pending_lookups.get(lookup_key)
+        if pending is None:
+            pending = self._pending_lookups[lookup_key] = asyncio.ensure_future(fetch())
+            pending.add_done_callback(lambda _: self._pending_lookups.pop(lookup_key, None))
+        
+        # shield : l'annulation d'un appelant n'annule pas le fetch des autres
+        value = await asyncio.shield(pending)
+        if value is not None:
+            if len(self._lookups) >= LOOKUP_MAX_SIZE:
+                # Évince l'entrée la plus ancienne
+                del self._lookups[next(iter(self._lookups))]
+            ttl = LOOKUP_TTLS.get(kind, LOOKUP_TTL)
+            self._lookups[lookup_key] = (value, time.monotonic() + ttl)
+        return value
+    
+    def invalidate_lookup(self, kind: str, key: Optional[str] = None) -> int:
+        """Invalide une entrée du cache local (ou toutes celles d'un type)."""
+        stale = [k for k in self._lookups if k[0] == kind and (key is None or k[1] == key)]
+        for k in stale:
+            del self._lookups[k]
+        return len(stale)
+    
     # === Workflow Operations ===
     
     async def get_workflow(self, workflow_id: str) -> Optional[Dict[str, Any]]:
         """Récupère un workflow par son ID."""
         try:
-            client = await self.get_client()
-            response = await client.get(f"/api/internal/workflows/{workflow_id}")
+            response = await self._get(f"/api/internal/workflows/{workflow_id}")
             
             if response.status_code == 200:
                 return response.json()
@@ -75,8 +175,7 @@ class BackendClient:
     async def get_workflow_tasks(self, workflow_id: str) -> List[Dict[str, Any]]:
         """Récupère les tâches d'un workflow."""
         try:
-            client = await self.get_client()
-            response = await client.get(f"/api/internal/workflows/{workflow_id}/tasks")
+            response = await self._get(f"/api/internal/workflows/{workflow_id}/tasks")
             
             if response.status_code == 200:
                 return response.json()
@@ -88,6 +187,56 @@ class BackendClient:
             logger.error("workflow_tasks_fetch_error", error=str(e))
             return []
     
+    async def get_workflow_with_tasks(self, workflow_id: str) -> Optional[Dict[str, Any]]:
+        """Récupère un workflow et ses tâches (`tasks`) en un seul appel."""
+        try:
+            response = await self._get(f"/api/internal/workflows/{workflow_id}/full")
+            
+            if response.status_code == 200:
+                return response.json()
+            elif response.status_code == 404:
+                logger.warning("workflow_not_found", workflow_id=workflow_id)
+                return None
+            else:
+                logger.error(
+                    "workflow_fetch_failed",
+                    workflow_id=workflow_id,
+                    status=response.status_code,
+                    response=response.text
+                )
+                return None
+                
+        except httpx.RequestError as e:
+            logger.error("workflow_fetch_error", workflow_id=workflow_id, error=str(e))
+            return None
+    
+    async def get_workflow_bundle(self, workflow_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Récupère un workflow avec ses tâches et les agents/prompts qu'elles référencent.
+        
+        Workflow et tâches arrivent en un appel, puis tous les agents et
+        prompts en une seule vague (`agents` / `prompts`, indexés par ID).
+        """
+        workflow = await self.get_workflow_with_tasks(workflow_id)
+        if not workflow:
+            return None
+        
+        tasks = workflow.get("tasks", [])
+        configs = [task.get("config") or {} for task in tasks]
+        agent_ids = list(
+            ({workflow.get("agent_id")} | {c.get("agent_id") for c in configs}) - {None}
+        )
+        prompt_ids = list({c.get("prompt_id") for c in configs} - {None})
+        
+        results = await asyncio.gather(
+            *(self.get_agent(agent_id) for agent_id in agent_ids),
+            *(self.get_prompt(prompt_id) for prompt_id in prompt_ids),
+        )
+        
+        workflow["agents"] = dict(zip(agent_ids, results[:len(agent_ids)]))
+        workflow["prompts"] = dict(zip(prompt_ids, results[len(agent_ids):]))
+        return workflow
+    
     # === Execution Updates ===
     
     async def update_execution_status(
@@ -109,10 +258,9 @@ class BackendClient:
             payload["error"] = error
         
         try:
-            client = await self.get_client()
-            response = await client.patch(
+            response = await self._patch_json(
                 f"/api/internal/executions/{execution_id}",
-                json=payload
+                payload
             )
             
             if response.status_code == 200:
@@ -163,10 +311,12 @@ class BackendClient:
     # === Agent & Prompt Operations ===
     
     async def get_agent(self, agent_id: str) -> Optional[Dict[str, Any]]:
-        """Récupère un agent par son ID."""
+        """Récupère un agent par son ID (cache local TTL)."""
+        return await self._cached_lookup("agent", agent_id, lambda: self._fetch_agent(agent_id))
+    
+    async def _fetch_agent(self, agent_id: str) -> Optional[Dict[str, Any]]:
         try:
-            client = await self.get_client()
-            response = await client.get(f"/api/internal/agents/{agent_id}")
+            response = await self._get(f"/api/internal/agents/{agent_id}")
             
             if response.status_code == 200:
                 return response.json()
@@ -179,10 +329,12 @@ class BackendClient:
             return None
     
     async def get_prompt(self, prompt_id: str) -> Optional[Dict[str, Any]]:
-        """Récupère un prompt par son ID."""
+        """Récupère un prompt par son ID (cache local TTL)."""
+        return await self._cached_lookup("prompt", prompt_id, lambda: self._fetch_prompt(prompt_id))
+    
+    async def _fetch_prompt(self, prompt_id: str) -> Optional[Dict[str, Any]]:
         try:
-            client = await self.get_client()
-            response = await client.get(f"/api/internal/prompts/{prompt_id}")
+            response = await self._get(f"/api/internal/prompts/{prompt_id}")
             
             if response.status_code == 200:
                 return response.json()
@@ -190,13 +342,84 @@ class BackendClient:
         except httpx.RequestError:
             return None
     
+    async def get_prompt_template(
+        self,
+        template_id: str,
+        tenant_id: str
+    ) -> Optional[Dict[str, Any]]:
+        """Récupère un template de prompt pour un tenant."""
+        try:
+            response = await self._get(
+                f"/api/prompts/{template_id}",
+                headers={"X-Tenant-ID": tenant_id},
+                timeout=10.0
+            )
+            
+            if response.status_code == 200:
+                return response.json()
+            return None
+        except httpx.RequestError as e:
+            logger.error("prompt_template_fetch_error", template_id=template_id, error=str(e))
+            return None
+    
+    # === Scheduled Jobs & Maintenance ===
+    
+    async def get_pending_scheduled_jobs(self) -> Optional[List[Dict[str, Any]]]:
+        """Récupère les jobs planifiés à déclencher (None en cas d'échec)."""
+        try:
+            response = await self._get("/api/scheduled-jobs/pending", timeout=10.0)
+            
+            if response.status_code == 200:
+                # Parse the raw bytes directly (no str decode + stdlib json pass)
+                return orjson.loads(response.content).get("jobs", [])
+            
+            logger.warning("pending_jobs_fetch_failed", status_code=response.status_code)
+            return None
+        except httpx.RequestError as e:
+            logger.error("pending_jobs_fetch_error", error=str(e))
+            return None
+    
+    async def cleanup_executions_before(
+        self,
+        cutoff: str,
+        after: Optional[str] = None
+    ) -> Optional[int]:
+        """
+        Supprime les exécutions terminées créées dans [after, cutoff) (ISO ;
+        sans borne basse si `after` est absent). Retourne le nombre supprimé.
+        """
+        params = {"before": cutoff}
+        if after:
+            params["after"] = after
+        
+        try:
+            client = await self.get_client()
+            response = await client.delete(
+                "/api/internal/executions/cleanup",
+                params=params,
+                timeout=30.0
+            )
+            
+            if response.status_code == 200:
+                return response.json().get("deleted", 0)
+            
+            logger.warning("executions_cleanup_failed", status_code=response.status_code)
+            return None
+        except httpx.RequestError as e:
+            logger.error("executions_cleanup_error", error=str(e))
+            return None
+    
     # === Tenant LLM Config ===
     
     async def get_tenant_llm_config(self, tenant_id: str) -> Optional[Dict[str, Any]]:
-        """Récupère la configuration LLM d'un tenant."""
+        """Récupère la configuration LLM d'un tenant (cache local TTL)."""
+        return await self._cached_lookup(
+            "llm_config", tenant_id, lambda: self._fetch_tenant_llm_config(tenant_id)
+        )
+    
+    async def _fetch_tenant_llm_config(self, tenant_id: str) -> Optional[Dict[str, Any]]:
         try:
-            client = await self.get_client()
-            response = await client.get(f"/api/internal/tenants/{tenant_id}/llm-config")
+            response = await self._get(f"/api/internal/tenants/{tenant_id}/llm-config")
             
             if response.status_code == 200:
                 return response.json()
@@ -217,13 +440,47 @@ class BackendClient:
             return False
 
 
-# Singleton instance
-_backend_client: Optional[BackendClient] = None
+# One instance per event loop: the httpx pool's locks are bound to the loop
+# that created them. Entries go away with their loop.
+_backend_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, BackendClient]" = (
+    weakref.WeakKeyDictionary()
+)
+_default_client: Optional[BackendClient] = None
 
 
 def get_backend_client() -> BackendClient:
-    """Get or create the backend client singleton."""
-    global _backend_client
-    if _backend_client is None:
-        _backend_client = BackendClient()
-    return _backend_client
+    """Get or create the backend client for the running event loop."""
+    global _default_client
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # Outside a loop (sync code paths): process-wide fallback
+        if _default_client is None:
+            _default_client = BackendClient()
+        return _default_client
+    
+    client = _backend_clients.get(loop)
+    if client is None:
+        client = _backend_clients[loop] = BackendClient()
+    return client
+
+
+async def listen_for_lookup_invalidations(redis: Redis):
+    """Consomme `cache:invalidate:{kind}:{id}` et invalide le cache local."""
+    pubsub = redis.pubsub()
+    await pubsub.psubscribe(LOOKUP_INVALIDATION_PATTERN)
+    
+    try:
+        async for message in pubsub.listen():
+            if message["type"] != "pmessage":
+                continue
+            
+            channel = message["channel"]
+            if isinstance(channel, bytes):
+                channel = channel.decode()
+            
+            _, _, kind, key = channel.split(":", 3)
+            removed = get_backend_client().invalidate_lookup(kind, key)
+            logger.debug("lookup_invalidated", kind=kind, key=key, removed=removed)
+    finally:
+        await pubsub.punsubscribe(LOOKUP_INVALIDATION_PATTERN)
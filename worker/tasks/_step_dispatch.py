@@ -0,0 +1,60 @@
+"""
+Step dispatch - Per-step glue of the workflow task runner.
+
+Kept free of worker imports and fully annotated so it can be compiled
+ahead of time (`mypyc tasks/_step_dispatch.py`, or the Dockerfile's
+`compiled` target); the pure-Python module is used as-is when no compiled
+extension is present.
+"""
+from typing import Any, Awaitable, Callable, Dict, Mapping
+import structlog
+
+logger = structlog.get_logger()
+
+
+StepHandler = Callable[[Dict[str, Any], Dict[str, Any], str], Awaitable[Any]]
+
+
+async def dispatch_step(
+    handlers: Mapping[str, StepHandler],
+    workflow_id: str,
+    tenant_id: str,
+    step_index: int,
+    step_config: Dict[str, Any],
+    context: Dict[str, Any],
+) -> Dict[str, Any]:
+    """Run a step through its type's handler and wrap the outcome as a step result."""
+    step_type = step_config.get("type")
+
+    logger.info(
+        "Executing workflow step",
+        workflow_id=workflow_id,
+        step_index=step_index,
+        step_type=step_type,
+    )
+
+    try:
+        handler = handlers.get(step_type) if step_type is not None else None
+        if handler is None:
+            raise ValueError(f"Unknown step type: {step_type}")
+        result = await handler(step_config, context, tenant_id)
+
+        return {
+            "status": "success",
+            "step_index": step_index,
+            "step_type": step_type,
+            "output": result,
+        }
+
+    except Exception as e:
+        logger.error(
+            "Step execution failed",
+            step_index=step_index,
+            error=str(e),
+        )
+        return {
+            "status": "failed",
+            "step_index": step_index,
+            "step_type": step_type,
+            "error": str(e),
+        }
@@ -1,16 +1,56 @@
 """
 Scheduled Tasks - Periodic job implementations.
 """
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime, timedelta
+from functools import lru_cache
+import asyncio
+import re
+from arq import ArqRedis, create_pool
+from arq.connections import RedisSettings
+from langchain_core.messages import HumanMessage
+from langchain_groq import ChatGroq
 import structlog
 from redis.asyncio import Redis
 
 from config import settings
+from llm.cache import cached_invoke
+from llm.http import get_llm_http_client
+from services.backend_client import get_backend_client
+from templating import substitute_variables
+from tools.email import EmailTool
 
 logger = structlog.get_logger()
 
 
+_arq_pool: Optional[ArqRedis] = None
+
+# Generated email: "Objet: ...\n\n<body>" (prefix optional)
+_EMAIL_RE = re.compile(
+    r"\s*(?:(?:Objet|Subject)\s*:\s*)?(?P<subject>[^\n]*?)\s*\n(?P<body>.*?)\s*\Z",
+    re.DOTALL | re.IGNORECASE,
+)
+
+
+async def get_arq_pool() -> ArqRedis:
+    """Get or create the ARQ pool used to enqueue jobs."""
+    global _arq_pool
+    if _arq_pool is None:
+        _arq_pool = await create_pool(
+            RedisSettings.from_dsn(settings.REDIS_URL),
+            default_queue_name=settings.QUEUE_NAME,
+        )
+    return _arq_pool
+
+
+async def close_arq_pool():
+    """Close the ARQ pool."""
+    global _arq_pool
+    if _arq_pool is not None:
+        await _arq_pool.close()
+    _arq_pool = None
+
+
 async def process_pending_workflows(redis: Redis):
     """
     Check and trigger pending scheduled workflows.
@@ -18,41 +58,32 @@ async def process_pending_workflows(redis: Redis):
     Runs every 15 minutes to check for workflows
     that should be triggered based on their schedule.
     """
-    import httpx
-    
     logger.debug("Checking pending scheduled workflows")
     
     try:
         # Get pending workflows from backend
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{settings.BACKEND_URL}/api/scheduled-jobs/pending",
-                timeout=10.0,
-            )
-            
-            if response.status_code != 200:
-                logger.warning(
-                    "Failed to get pending workflows",
-                    status_code=response.status_code,
-                )
-                return
-            
-            pending_jobs = response.json().get("jobs", [])
+        pending_jobs = await get_backend_client().get_pending_scheduled_jobs()
+        
+        if pending_jobs is None:
+            logger.warning("Failed to get pending workflows")
+            return
         
         logger.info(
             "Found pending workflows",
             count=len(pending_jobs),
         )
         
-        # Queue each job for execution
-        for job in pending_jobs:
-            await queue_workflow_execution(
+        # Queue each job for execution (enqueues share the pooled connection)
+        await asyncio.gather(*(
+            queue_workflow_execution(
                 redis=redis,
                 workflow_id=job.get("workflow_id"),
                 tenant_id=job.get("tenant_id"),
                 trigger="schedule",
                 job_id=job.get("id"),
             )
+            for job in pending_jobs
+        ))
             
     except Exception as e:
         logger.error("Failed to process pending workflows", error=str(e))
@@ -77,10 +108,7 @@ async def queue_workflow_execution(
         job_id: Optional scheduled job ID
         input_data: Optional input data
     """
-    from arq import create_pool
-    from arq.connections import RedisSettings
-    
-    pool = await create_pool(RedisSettings.from_dsn(settings.REDIS_URL))
+    pool = await get_arq_pool()
     
     await pool.enqueue_job(
         "execute_workflow",
@@ -96,8 +124,6 @@ async def queue_workflow_execution(
         tenant_id=tenant_id,
         trigger=trigger,
     )
-    
-    await pool.close()
 
 
 async def process_scheduled_email(
@@ -118,10 +144,6 @@ async def process_scheduled_email(
     Returns:
         Send result
     """
-    from tools.email import EmailTool
-    from langchain_groq import ChatGroq
-    from langchain_core.messages import HumanMessage
-    
     logger.info(
         "Processing scheduled email",
         tenant_id=tenant_id,
@@ -137,27 +159,10 @@ async def process_scheduled_email(
             raise ValueError(f"Template not found: {template_id}")
         
         # Substitute variables in template
-        prompt = template.get("template", "")
-        for key, value in variables.items():
-            prompt = prompt.replace(f"{{{key}}}", str(value))
+        prompt = substitute_variables(template.get("template", ""), variables)
         
-        # Generate email content with LLM
-        llm = ChatGroq(
-            api_key=settings.GROQ_API_KEY,
-            model="llama-3.3-70b-versatile",
-        )
-        
-        response = await llm.ainvoke([
-            HumanMessage(content=f"Génère un email professionnel basé sur: {prompt}")
-        ])
-        
-        email_content = response.content
-        
-        # Parse subject and body from response
-        # Assuming format: "Objet: ...\n\n..."
-        lines = email_content.strip().split("\n", 2)
-        subject = lines[0].replace("Objet:", "").replace("Subject:", "").strip()
-        body = "\n".join(lines[1:]).strip() if len(lines) > 1 else email_content
+        # Generate email content with LLM (cached per rendered prompt)
+        subject, body = await generate_email(prompt, tenant_id)
         
         # Send email
         email_tool = EmailTool(
@@ -190,67 +195,91 @@ async def process_scheduled_email(
         }
 
 
+@lru_cache(maxsize=8)
+def get_email_llm(model: str = "llama-3.3-70b-versatile") -> ChatGroq:
+    """Shared ChatGroq instance per model (on the shared LLM connection pool)."""
+    return ChatGroq(
+        api_key=settings.GROQ_API_KEY,
+        model=model,
+        http_async_client=get_llm_http_client(),
+    )
+
+
+async def generate_email(prompt: str, tenant_id: str, ttl: int = 3600) -> Tuple[str, str]:
+    """
+    Generate (subject, body) for a rendered email prompt.
+    
+    The output depends only on the prompt (template + variables), not on
+    the recipients, so it goes through the exact-match LLM cache: resending
+    the same templated email for a tenant does not call the LLM again.
+    """
+    response = await cached_invoke(
+        get_email_llm(),
+        [HumanMessage(content=f"Génère un email professionnel basé sur: {prompt}")],
+        tenant_id=tenant_id,
+        ttl=ttl,
+        deterministic=True,
+    )
+    
+    email_content = response.content
+    
+    # Parse subject and body from response (single line: body only)
+    match = _EMAIL_RE.match(email_content)
+    if match is None:
+        return "", email_content
+    
+    return match["subject"], match["body"]
+
+
 async def load_prompt_template(
     template_id: str,
     tenant_id: str,
 ) -> Dict[str, Any]:
     """Load prompt template from backend."""
-    import httpx
-    
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{settings.BACKEND_URL}/api/prompts/{template_id}",
-                headers={"X-Tenant-ID": tenant_id},
-                timeout=10.0,
-            )
-            
-            if response.status_code == 200:
-                return response.json()
-            return None
-            
+        return await get_backend_client().get_prompt_template(template_id, tenant_id)
     except Exception as e:
         logger.error("Failed to load template", error=str(e))
         return None
 
 
-async def cleanup_executions(days_to_keep: int = 30):
+async def cleanup_executions(days_to_keep: int = 30, partition_days: int = 7):
     """
     Clean up old workflow execution logs.
     
+    The last `partition_days` days before the cutoff are deleted as one-day
+    windows in parallel (smaller statements, shorter locks when a backlog
+    built up), plus one open-ended request for anything older.
+    
     Args:
         days_to_keep: Number of days to keep logs
+        partition_days: Number of one-day windows before the cutoff
     """
-    import httpx
-    
-    cutoff_date = (datetime.utcnow() - timedelta(days=days_to_keep)).isoformat()
+    cutoff = datetime.utcnow() - timedelta(days=days_to_keep)
+    bounds = [(cutoff - timedelta(days=n)).isoformat() for n in range(partition_days + 1)]
     
     logger.info(
         "Cleaning up old executions",
-        cutoff_date=cutoff_date,
+        cutoff_date=bounds[0],
         days_to_keep=days_to_keep,
     )
     
+    client = get_backend_client()
+    
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.delete(
-                f"{settings.BACKEND_URL}/api/admin/executions/cleanup",
-                params={"before": cutoff_date},
-                timeout=30.0,
-            )
+        results = await asyncio.gather(
+            *(client.cleanup_executions_before(bounds[n], after=bounds[n + 1]) for n in range(partition_days)),
+            client.cleanup_executions_before(bounds[-1]),
+        )
+        
+        deleted = sum(r for r in results if r is not None)
+        failed = sum(1 for r in results if r is None)
+        
+        if not failed:
+            logger.info("Cleanup completed", deleted_count=deleted)
+        else:
+            logger.warning("Cleanup request failed", deleted_count=deleted, failed_partitions=failed)
             
-            if response.status_code == 200:
-                result = response.json()
-                logger.info(
-                    "Cleanup completed",
-                    deleted_count=result.get("deleted", 0),
-                )
-            else:
-                logger.warning(
-                    "Cleanup request failed",
-                    status_code=response.status_code,
-                )
-                
     except Exception as e:
         logger.error("Cleanup failed", error=str(e))
 
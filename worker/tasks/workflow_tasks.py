@@ -1,43 +1,109 @@
 """
 Workflow Tasks - Async workflow execution tasks.
 """
-from typing import Dict, Any, Optional
-from datetime import datetime
-import json
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from types import CodeType
+import ast
+import asyncio
+from functools import lru_cache
+from itertools import chain
+import logging
+import re
+import time
+import uuid
+from langchain_anthropic import ChatAnthropic
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from langchain_groq import ChatGroq
+from langchain_openai import ChatOpenAI
+import msgspec
 import structlog
 from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
 
 from config import settings
+from graphs.registry import get_or_build_graph
+from llm.cache import cached_invoke
+from llm.http import get_llm_http_client
+from llm.semantic_cache import cache_scope, semantic_lookup, semantic_store
+from services.backend_client import get_backend_client
+from tasks._step_dispatch import StepHandler, dispatch_step
+from templating import VAR_RE, compile_template, substitute_variables
+from tools import get_tool_by_id
 
 logger = structlog.get_logger()
 
 
+# Worker events are msgpack-framed; the `:mp` suffix keeps them apart from the
+# backend's own JSON events on `events:{tenant_id}`
+EVENTS_CHANNEL = "events:{tenant_id}:mp"
+
+
+class WorkflowEvent(msgspec.Struct, array_like=True):
+    """
+    Schéma fixe des événements worker -> backend SSE.
+    Miroir de `WorkerEvent` dans backend/services/event_service.py.
+    """
+    type: str
+    tenant_id: str
+    data: Dict[str, Any]
+    ts_ns: int  # epoch ns, formaté en ISO côté SSE
+
+
+# Outputs de steps non sérialisables: str()
+_EVENT_ENCODER = msgspec.msgpack.Encoder(enc_hook=str)
+
+
+@lru_cache(maxsize=1024)
+def _channel_for(tenant_id: str) -> bytes:
+    """Pre-encoded event channel of a tenant."""
+    return EVENTS_CHANNEL.format(tenant_id=tenant_id).encode()
+
+
+@lru_cache(maxsize=64)
+def _event_type(event_type: str) -> str:
+    return f"workflow.{event_type}"
+
+
 # ============================================================
 # 📡 Event Publishing (SSE via Redis Pub/Sub)
 # ============================================================
 
+def _encode_event(tenant_id: str, event_type: str, data: Dict[str, Any]) -> bytes:
+    """Encode a `WorkflowEvent` (msgpack) for a tenant channel."""
+    return _EVENT_ENCODER.encode(WorkflowEvent(
+        type=_event_type(event_type),
+        tenant_id=tenant_id,
+        data=data,
+        ts_ns=time.time_ns(),
+    ))
+
+
 async def publish_workflow_event(
     redis: Redis,
     tenant_id: str,
     event_type: str,
-    data: Dict[str, Any]
+    data: Dict[str, Any],
+    pipeline: Optional[Pipeline] = None
 ):
     """
     Publie un événement workflow sur le channel Redis du tenant.
-    Ces événements sont consommés par le backend SSE endpoint.
+    Ces événements sont consommés par le backend SSE endpoint
+    (`WorkflowEvent` en msgpack, re-sérialisés en JSON côté SSE).
+    
+    Avec `pipeline`, le PUBLISH est seulement mis en file : l'appelant
+    envoie le lot avec `pipeline.execute()`.
     """
-    event = {
-        "type": f"workflow.{event_type}",
-        "tenant_id": tenant_id,
-        "data": data,
-        "timestamp": datetime.utcnow().isoformat(),
-    }
+    channel = _channel_for(tenant_id)
     
-    channel = f"events:{tenant_id}"
+    payload = _encode_event(tenant_id, event_type, data)
+    if pipeline is not None:
+        pipeline.publish(channel, payload)
+        return
     
     try:
-        await redis.publish(channel, json.dumps(event))
-        logger.debug("event_published", event_type=f"workflow.{event_type}", channel=channel)
+        await redis.publish(channel, payload)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("event_published", event_type=event_type, channel=channel)
     except Exception as e:
         logger.error("event_publish_failed", error=str(e))
 
@@ -50,7 +116,8 @@ async def publish_step_event(
     step_index: int,
     step_name: str,
     status: str,
-    output: Any = None
+    output: Any = None,
+    pipeline: Optional[Pipeline] = None
 ):
     """Publie un événement de progression de step."""
     await publish_workflow_event(
@@ -64,7 +131,8 @@ async def publish_step_event(
             "step_name": step_name,
             "status": status,
             "output": output,
-        }
+        },
+        pipeline=pipeline
     )
 
 
@@ -72,59 +140,183 @@ async def publish_step_event(
 # Workflow Execution
 # ============================================================
 
+STATE_TTL = 86400  # 24h
+
+
+def _now_ms() -> int:
+    """State hash timestamps: epoch milliseconds."""
+    return time.time_ns() // 1_000_000
+
+
+# KEYS: state hash [, event channel]; ARGV: ttl, event payload, field, value, ...
+_WRITE_STATE_LUA = """
+redis.call('HSET', KEYS[1], unpack(ARGV, 3))
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+if #KEYS > 1 then
+    redis.call('PUBLISH', KEYS[2], ARGV[2])
+end
+return 1
+"""
+
+_write_state_script = None
+
+
+async def _write_state(
+    redis: Redis,
+    state_key: str,
+    mapping: Dict[str, Any],
+    tenant_id: Optional[str] = None,
+    event_type: Optional[str] = None,
+    event_data: Optional[Dict[str, Any]] = None,
+    pipeline: Optional[Pipeline] = None,
+):
+    """
+    HSET + EXPIRE de l'état d'exécution (+ PUBLISH d'un événement), atomique
+    et en un aller-retour (script Lua, EVALSHA une fois en cache côté Redis).
+    
+    Avec `pipeline`, le script est mis en file avec les autres commandes du lot.
+    """
+    global _write_state_script
+    if _write_state_script is None:
+        _write_state_script = redis.register_script(_WRITE_STATE_LUA)
+    
+    keys = [state_key]
+    payload = b""
+    if event_type is not None:
+        keys.append(_channel_for(tenant_id))
+        payload = _encode_event(tenant_id, event_type, event_data)
+    
+    await _write_state_script(
+        keys=keys,
+        args=[STATE_TTL, payload, *chain.from_iterable(mapping.items())],
+        client=pipeline if pipeline is not None else redis,
+    )
+
+
+# ============================================================
+# Background notifications (fire-and-forget)
+# ============================================================
+
+# Strong refs: the loop only keeps weak refs to tasks
+_background_tasks: set = set()
+
+
+async def _run_in_background(coro, what: str, **log_context):
+    try:
+        await coro
+    except Exception as e:
+        logger.error("background_task_failed", task=what, error=str(e), **log_context)
+
+
+def spawn_background(coro, what: str, **log_context) -> asyncio.Task:
+    """Schedule a best-effort coroutine off the critical path (errors logged)."""
+    task = asyncio.create_task(_run_in_background(coro, what, **log_context))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+async def drain_background_tasks(timeout: float = 10.0):
+    """Wait for pending notifications (worker shutdown)."""
+    if _background_tasks:
+        await asyncio.wait(set(_background_tasks), timeout=timeout)
+
+
+async def _write_completion(
+    redis: Redis,
+    state_key: str,
+    mapping: Dict[str, Any],
+    tenant_id: str,
+    workflow_id: str,
+    execution_id: str,
+    tasks: list,
+    result: Dict[str, Any],
+):
+    """Step events, then final state + completed event, in one round-trip."""
+    step_results = result.get("step_results") or []
+    async with redis.pipeline(transaction=False) as pipe:
+        for step_result in step_results:
+            step_index = step_result["step_index"]
+            await publish_step_event(
+                redis=redis,
+                tenant_id=tenant_id,
+                workflow_id=workflow_id,
+                execution_id=execution_id,
+                step_index=step_index,
+                step_name=tasks[step_index].get("name", "") if step_index < len(tasks) else "",
+                status=step_result.get("status"),
+                output=step_result.get("output"),
+                pipeline=pipe,
+            )
+        await _write_state(
+            redis,
+            state_key,
+            mapping,
+            tenant_id=tenant_id,
+            event_type="completed",
+            event_data={
+                "workflow_id": workflow_id,
+                "execution_id": execution_id,
+                "message": "Workflow completed successfully",
+                "steps_completed": len(step_results),
+                "output_data": result.get("output_data", {}),
+            },
+            pipeline=pipe,
+        )
+        await pipe.execute()
+
+
 async def run_workflow(
     workflow_id: str,
     tenant_id: str,
     input_data: Dict[str, Any],
     redis: Redis,
     execution_id: str = None,
+    resume_state: Optional[Dict[str, Any]] = None,
 ) -> Dict[str, Any]:
     """
     Execute a complete workflow.
     
+    A workflow that reaches a long wait step is paused: its progress is
+    snapshotted into a `resume_workflow` job deferred by the wait duration,
+    and this job returns immediately with status "paused".
+    
     Args:
         workflow_id: Workflow to execute
         tenant_id: Tenant ID
         input_data: Input data for workflow
-        redis: Redis connection for state
+        redis: ARQ Redis connection (state, events, deferred jobs)
         execution_id: Optional execution ID (auto-generated if not provided)
+        resume_state: Progress snapshot of a paused execution to resume
         
     Returns:
         Execution result with status and outputs
     """
-    from graphs.workflow_agent import create_workflow_agent_graph
-    import uuid
-    
     execution_id = execution_id or str(uuid.uuid4())
+    log = logger.bind(workflow_id=workflow_id, execution_id=execution_id)
     
-    logger.info(
-        "Starting workflow execution",
-        workflow_id=workflow_id,
-        tenant_id=tenant_id,
-        execution_id=execution_id,
-    )
+    log.info("Starting workflow execution", tenant_id=tenant_id)
     
     # Store execution state in Redis
     state_key = f"workflow:{tenant_id}:{workflow_id}:{execution_id}"
     
-    await redis.hset(state_key, mapping={
-        "status": "running",
-        "started_at": datetime.utcnow().isoformat(),
-        "workflow_id": workflow_id,
-        "tenant_id": tenant_id,
-    })
-    await redis.expire(state_key, 86400)  # 24h TTL
-    
-    # 📡 Publish workflow started event
-    await publish_workflow_event(
-        redis=redis,
+    # 📡 + workflow started event (not on resume), one round-trip
+    await _write_state(
+        redis,
+        state_key,
+        {
+            "status": "running",
+            "started_at_ms": _now_ms(),
+            "workflow_id": workflow_id,
+            "tenant_id": tenant_id,
+        },
         tenant_id=tenant_id,
-        event_type="started",
-        data={
+        event_type="started" if resume_state is None else None,
+        event_data={
             "workflow_id": workflow_id,
             "execution_id": execution_id,
             "message": "Workflow started",
-        }
+        },
     )
     
     try:
@@ -133,96 +325,112 @@ async def run_workflow(
         
         if not workflow:
             raise ValueError(f"Workflow not found: {workflow_id}")
+        tasks = workflow.get("tasks") or []
         
         # Create and execute graph
-        graph = await create_workflow_agent_graph(workflow_id, tenant_id)
+        graph = await get_or_build_graph("workflow", workflow_id, tenant_id)
         
-        result = await graph.ainvoke({
-            "workflow_id": workflow_id,
-            "tenant_id": tenant_id,
-            "steps": workflow.get("tasks", []),
-            "input_data": input_data,
-            "current_step": 0,
-            "total_steps": len(workflow.get("tasks", [])),
-        })
+        if resume_state is None:
+            result = await graph.ainvoke({
+                "workflow_id": workflow_id,
+                "tenant_id": tenant_id,
+                "steps": tasks,
+                "input_data": input_data,
+                "current_step": 0,
+                "total_steps": len(tasks),
+            })
+        else:
+            result = await graph.ainvoke({
+                **resume_state,
+                "workflow_id": workflow_id,
+                "tenant_id": tenant_id,
+                "input_data": input_data,
+                "status": "resuming",
+            })
         
-        # Update execution state
-        await redis.hset(state_key, mapping={
-            "status": result.get("status", "completed"),
-            "completed_at": datetime.utcnow().isoformat(),
-            "steps_completed": len(result.get("step_results", [])),
-        })
+        if result.get("status") == "paused":
+            return await pause_workflow(
+                redis=redis,
+                workflow_id=workflow_id,
+                tenant_id=tenant_id,
+                execution_id=execution_id,
+                input_data=input_data,
+                state_key=state_key,
+                result=result,
+            )
         
-        # Notify backend of completion
-        await notify_workflow_completed(
-            workflow_id=workflow_id,
-            tenant_id=tenant_id,
-            execution_id=execution_id,
-            result=result,
-        )
+        status = result.get("status", "completed")
+        steps_completed = len(result.get("step_results") or [])
         
-        # 📡 Publish workflow completed event
-        await publish_workflow_event(
-            redis=redis,
-            tenant_id=tenant_id,
-            event_type="completed",
-            data={
-                "workflow_id": workflow_id,
-                "execution_id": execution_id,
-                "message": "Workflow completed successfully",
-                "steps_completed": len(result.get("step_results", [])),
-                "output_data": result.get("output_data", {}),
-            }
+        # Update execution state + 📡 publish step/completed events, one round-trip
+        await _write_completion(
+            redis,
+            state_key,
+            {
+                "status": status,
+                "completed_at_ms": _now_ms(),
+                "steps_completed": steps_completed,
+            },
+            tenant_id,
+            workflow_id,
+            execution_id,
+            tasks,
+            result,
         )
         
-        logger.info(
-            "Workflow completed",
-            workflow_id=workflow_id,
+        # Notify backend off the critical path
+        spawn_background(
+            notify_workflow_completed(
+                workflow_id=workflow_id,
+                tenant_id=tenant_id,
+                execution_id=execution_id,
+                result=result,
+            ),
+            "notify_workflow_completed",
             execution_id=execution_id,
-            status=result.get("status"),
         )
         
+        log.info("Workflow completed", status=status)
+        
         return {
             "execution_id": execution_id,
-            "status": result.get("status", "completed"),
-            "steps_completed": len(result.get("step_results", [])),
+            "status": status,
+            "steps_completed": steps_completed,
             "output_data": result.get("output_data", {}),
         }
         
     except Exception as e:
-        logger.error(
-            "Workflow failed",
-            workflow_id=workflow_id,
-            execution_id=execution_id,
-            error=str(e),
-        )
+        log.error("Workflow failed", error=str(e))
         
-        # Update state
-        await redis.hset(state_key, mapping={
-            "status": "failed",
-            "error": str(e),
-            "failed_at": datetime.utcnow().isoformat(),
-        })
-        
-        # 📡 Publish workflow failed event
-        await publish_workflow_event(
-            redis=redis,
+        # Update state + 📡 publish workflow failed event
+        await _write_state(
+            redis,
+            state_key,
+            {
+                "status": "failed",
+                "error": str(e),
+                "failed_at_ms": _now_ms(),
+            },
             tenant_id=tenant_id,
             event_type="failed",
-            data={
+            event_data={
                 "workflow_id": workflow_id,
                 "execution_id": execution_id,
                 "message": "Workflow failed",
                 "error": str(e),
-            }
+            },
         )
         
-        # Notify backend of failure
-        await notify_workflow_failed(
-            workflow_id=workflow_id,
-            tenant_id=tenant_id,
+        # Notify backend of failure (background)
+        spawn_background(
+            notify_workflow_failed(
+                workflow_id=workflow_id,
+                tenant_id=tenant_id,
+                execution_id=execution_id,
+                error=str(e),
+            ),
+            "notify_workflow_failed",
             execution_id=execution_id,
-            error=str(e),
         )
         
         return {
@@ -232,6 +440,70 @@ async def run_workflow(
         }
 
 
+async def pause_workflow(
+    redis: Redis,
+    workflow_id: str,
+    tenant_id: str,
+    execution_id: str,
+    input_data: Dict[str, Any],
+    state_key: str,
+    result: Dict[str, Any],
+) -> Dict[str, Any]:
+    """Snapshot a paused workflow and enqueue its continuation."""
+    resume_after = result.get("resume_after", 0)
+    resume_state = {
+        "steps": result.get("steps", []),
+        "total_steps": result.get("total_steps", 0),
+        "step_levels": result.get("step_levels", []),
+        "current_level": result.get("current_level", 0),
+        "current_step": result.get("current_step", 0),
+        "step_results": result.get("step_results", []),
+        "success_count": result.get("success_count", 0),
+    }
+    
+    await redis.enqueue_job(
+        "resume_workflow",
+        workflow_id,
+        tenant_id,
+        execution_id,
+        input_data,
+        resume_state,
+        _defer_by=resume_after,
+        _queue_name=settings.QUEUE_NAME,
+    )
+    
+    await _write_state(
+        redis,
+        state_key,
+        {
+            "status": "paused",
+            "resume_at_ms": _now_ms() + int(resume_after * 1000),
+        },
+        tenant_id=tenant_id,
+        event_type="paused",
+        event_data={
+            "workflow_id": workflow_id,
+            "execution_id": execution_id,
+            "message": f"Workflow paused for {resume_after}s",
+            "steps_completed": resume_state["current_step"],
+        },
+    )
+    
+    logger.info(
+        "Workflow paused",
+        workflow_id=workflow_id,
+        execution_id=execution_id,
+        resume_after=resume_after,
+    )
+    
+    return {
+        "execution_id": execution_id,
+        "status": "paused",
+        "resume_after": resume_after,
+        "steps_completed": resume_state["current_step"],
+    }
+
+
 async def execute_workflow_step(
     workflow_id: str,
     tenant_id: str,
@@ -252,64 +524,70 @@ async def execute_workflow_step(
     Returns:
         Step result
     """
-    step_type = step_config.get("type")
+    return await dispatch_step(STEP_HANDLERS, workflow_id, tenant_id, step_index, step_config, context)
+
+
+@lru_cache(maxsize=256)
+def get_step_llm(provider: str, api_key: str, model: str, temperature: float) -> Any:
+    """Chat model per (provider, key, model, temperature), reused across steps and workflows."""
+    if provider == "openai":
+        return ChatOpenAI(
+            api_key=api_key, model=model, temperature=temperature,
+            http_async_client=get_llm_http_client(),
+        )
+    if provider == "anthropic":
+        return ChatAnthropic(api_key=api_key, model=model, temperature=temperature)
     
-    logger.info(
-        "Executing workflow step",
-        workflow_id=workflow_id,
-        step_index=step_index,
-        step_type=step_type,
+    # Groq (default / fallback)
+    return ChatGroq(
+        api_key=api_key, model=model, temperature=temperature,
+        http_async_client=get_llm_http_client(),
     )
-    
-    try:
-        if step_type == "llm_generate":
-            result = await execute_llm_step(step_config, context)
-        elif step_type == "tool_call":
-            result = await execute_tool_step(step_config, context, tenant_id)
-        elif step_type == "condition":
-            result = await execute_condition_step(step_config, context)
-        elif step_type == "loop":
-            result = await execute_loop_step(step_config, context, tenant_id)
-        elif step_type == "human_approval":
-            result = await execute_approval_step(step_config, context, tenant_id)
-        else:
-            raise ValueError(f"Unknown step type: {step_type}")
-        
-        return {
-            "status": "success",
-            "step_index": step_index,
-            "step_type": step_type,
-            "output": result,
-        }
-        
-    except Exception as e:
-        logger.error(
-            "Step execution failed",
-            step_index=step_index,
-            error=str(e),
-        )
-        return {
-            "status": "failed",
-            "step_index": step_index,
-            "step_type": step_type,
-            "error": str(e),
-        }
 
 
-async def execute_llm_step(
+def build_step_messages(
     config: Dict[str, Any],
     context: Dict[str, Any],
-    tenant_id: str = None,
-) -> str:
-    """Execute LLM generation step with tenant-specific config."""
-    from langchain_core.messages import HumanMessage
+    provider: str,
+) -> Tuple[List[BaseMessage], str, str]:
+    """
+    Build an LLM step's messages, static content first.
     
-    prompt = config.get("prompt", "")
+    `system_prefix` + `few_shot` are sent verbatim as the system message (a
+    stable prefix for provider-side prompt caching); only `user_suffix`
+    (or the legacy `prompt`) gets variable substitution.
     
-    # Substitute variables
-    for key, value in context.items():
-        prompt = prompt.replace(f"{{{key}}}", str(value))
+    Returns:
+        (messages, static prefix, substituted user prompt)
+    """
+    static = "\n\n".join(
+        part for part in (config.get("system_prefix"), config.get("few_shot")) if part
+    )
+    prompt = substitute_variables(config.get("user_suffix", config.get("prompt", "")), context)
     
+    if not static:
+        return [HumanMessage(content=prompt)], static, prompt
+    
+    if provider == "anthropic":
+        # Explicit cache breakpoint (OpenAI/Groq cache prefixes automatically)
+        system = SystemMessage(content=[
+            {"type": "text", "text": static, "cache_control": {"type": "ephemeral"}},
+        ])
+    else:
+        system = SystemMessage(content=static)
+    return [system, HumanMessage(content=prompt)], static, prompt
+
+
+async def resolve_step_llm(
+    config: Dict[str, Any],
+    tenant_id: Optional[str],
+) -> Tuple[Any, str, str, float]:
+    """
+    Resolve an LLM step's chat model from the tenant config.
+    
+    Returns:
+        (llm, provider, model, temperature)
+    """
     # Get tenant LLM config
     api_key, provider, model = await get_llm_for_tenant(tenant_id) if tenant_id else (
         settings.GROQ_API_KEY, "groq", "llama-3.3-70b-versatile"
@@ -319,22 +597,44 @@ async def execute_llm_step(
     model = config.get("model", model)
     temperature = config.get("temperature", 0.7)
     
-    # Create LLM based on provider
-    if provider == "groq":
-        from langchain_groq import ChatGroq
-        llm = ChatGroq(api_key=api_key, model=model, temperature=temperature)
-    elif provider == "openai":
-        from langchain_openai import ChatOpenAI
-        llm = ChatOpenAI(api_key=api_key, model=model, temperature=temperature)
-    elif provider == "anthropic":
-        from langchain_anthropic import ChatAnthropic
-        llm = ChatAnthropic(api_key=api_key, model=model, temperature=temperature)
-    else:
-        # Fallback Groq
-        from langchain_groq import ChatGroq
-        llm = ChatGroq(api_key=api_key, model=model, temperature=temperature)
+    # LLM client for this provider (cached instance)
+    return get_step_llm(provider, api_key, model, temperature), provider, model, temperature
+
+
+async def execute_llm_step(
+    config: Dict[str, Any],
+    context: Dict[str, Any],
+    tenant_id: str = None,
+) -> str:
+    """Execute LLM generation step with tenant-specific config."""
+    llm, provider, model, temperature = await resolve_step_llm(config, tenant_id)
+    
+    # Static prefix first, substituted variables last
+    messages, static, prompt = build_step_messages(config, context, provider)
+    
+    # Semantic cache: opt-in per step (one embedding call per lookup), and
+    # only for calls the exact-match cache would also cache
+    deterministic = config.get("deterministic", False)
+    ttl = config.get("cache_ttl", 3600)
+    semantic = bool(config.get("semantic_cache")) and (deterministic or not temperature)
+    if semantic:
+        scope = cache_scope(tenant_id, model, temperature, prefix=static)
+        cached, embedding = await semantic_lookup(
+            scope, prompt, threshold=config.get("semantic_cache_threshold")
+        )
+        if cached is not None:
+            return cached
     
-    response = await llm.ainvoke([HumanMessage(content=prompt)])
+    response = await cached_invoke(
+        llm,
+        messages,
+        tenant_id=tenant_id,
+        ttl=ttl,
+        deterministic=deterministic,
+    )
+    
+    if semantic:
+        await semantic_store(scope, prompt, embedding, response.content, ttl=ttl)
     return response.content
 
 
@@ -344,39 +644,89 @@ async def execute_tool_step(
     tenant_id: str,
 ) -> Dict[str, Any]:
     """Execute tool/action step."""
-    from tools import get_tool_by_id
-    
     tool_id = config.get("tool_id")
-    tool_input = config.get("input", {})
-    
-    # Substitute variables in input
-    for key, value in tool_input.items():
-        if isinstance(value, str):
-            for ctx_key, ctx_value in context.items():
-                tool_input[key] = value.replace(f"{{{ctx_key}}}", str(ctx_value))
+    # Substitute variables in input (new dict: the step config is shared)
+    tool_input = {
+        key: substitute_variables(value, context) if isinstance(value, str) else value
+        for key, value in config.get("input", {}).items()
+    }
     
     tool = get_tool_by_id(tool_id, tenant_id)
     return await tool.run(**tool_input)
 
 
+# Condition expressions: comparisons, boolean logic, arithmetic, literals,
+# indexing. No calls, attributes or comprehensions.
+_CONDITION_NODES = (
+    ast.Expression, ast.BoolOp, ast.BinOp, ast.UnaryOp, ast.Compare, ast.IfExp,
+    ast.Name, ast.Load, ast.Constant, ast.List, ast.Tuple, ast.Subscript, ast.Slice,
+    ast.And, ast.Or, ast.Not, ast.USub, ast.UAdd,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod,
+    ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE,
+    ast.In, ast.NotIn, ast.Is, ast.IsNot,
+)
+_CONDITION_CONSTANTS = {"true": True, "false": False, "null": None}
+
+
+@lru_cache(maxsize=1024)
+def compile_condition(template: str) -> Tuple[CodeType, Tuple[str, ...]]:
+    """
+    Compile a condition template once.
+    
+    `{key}` placeholders become local names (`_v0`, `_v1`, ...) resolved from
+    the context at evaluation time, so values are never spliced into source.
+    
+    Returns:
+        (code object, context key for each `_vN`)
+    """
+    keys = []
+    
+    def to_name(match: re.Match) -> str:
+        keys.append(match.group(1))
+        return f"_v{len(keys) - 1}"
+    
+    tree = ast.parse(VAR_RE.sub(to_name, template), mode="eval")
+    for node in ast.walk(tree):
+        if not isinstance(node, _CONDITION_NODES):
+            raise ValueError(f"Unsupported condition syntax: {type(node).__name__}")
+        if isinstance(node, ast.Name) and not (
+            node.id in _CONDITION_CONSTANTS or node.id.startswith("_v")
+        ):
+            raise ValueError(f"Unknown name in condition: {node.id}")
+    
+    return compile(tree, "<condition>", "eval"), tuple(keys)
+
+
 async def execute_condition_step(
     config: Dict[str, Any],
     context: Dict[str, Any],
+    tenant_id: str = None,
 ) -> Dict[str, Any]:
-    """Evaluate condition step."""
+    """
+    Evaluate condition step.
+    
+    An invalid condition or a missing variable fails the step rather than
+    silently taking either branch.
+    """
     condition = config.get("condition", "true")
     
-    # Simple evaluation (TODO: safer evaluation)
     try:
-        # Replace context variables
-        for key, value in context.items():
-            condition = condition.replace(f"{{{key}}}", repr(value))
+        code, keys = compile_condition(condition)
         
-        result = eval(condition)
-        return {"condition_met": bool(result)}
+        # Whitelisted AST only, no builtins; a missing key fails the evaluation
+        names = dict(_CONDITION_CONSTANTS)
+        names.update((f"_v{i}", context[key]) for i, key in enumerate(keys))
+        
+        result = eval(code, {"__builtins__": {}}, names)
     except Exception as e:
-        logger.warning(f"Condition evaluation failed: {e}")
-        return {"condition_met": True}
+        logger.warning("Condition evaluation failed", condition=condition, error=str(e))
+        raise ValueError(f"Condition evaluation failed: {e}") from e
+    
+    return {"condition_met": bool(result)}
+
+
+# Context key holding the outermost loop's semaphore (marks nested loops)
+LOOP_SLOTS_KEY = "_loop_slots"
 
 
 async def execute_loop_step(
@@ -384,19 +734,100 @@ async def execute_loop_step(
     context: Dict[str, Any],
     tenant_id: str,
 ) -> Dict[str, Any]:
-    """Execute loop step."""
+    """
+    Execute loop step.
+    
+    Iterations are independent: they run concurrently (at most
+    `max_concurrency` at a time), each one running the `steps` sub-steps
+    in order with `item`, `index` and earlier `loop_step_{j}_output` in context.
+    
+    A nested loop runs its iterations one after the other inside its
+    parent's slot, so the outermost loop's limit bounds the whole step.
+    """
     items_key = config.get("items_key", "items")
     items = context.get(items_key, [])
     max_iterations = config.get("max_iterations", 100)
+    sub_steps = config.get("steps", [])
+    
+    iterations = list(enumerate(items[:max_iterations]))
+    
+    nested = context.get(LOOP_SLOTS_KEY) is not None
+    if not nested:
+        semaphore = asyncio.Semaphore(config.get("max_concurrency", 16))
+        context = {**context, LOOP_SLOTS_KEY: semaphore}
     
-    results = []
-    for i, item in enumerate(items[:max_iterations]):
-        # TODO: Execute sub-steps for each item
-        results.append({"index": i, "item": item})
+    async def run_iteration(i: int, item: Any) -> Dict[str, Any]:
+        try:
+            return await _execute_iteration(i, item, sub_steps, context, tenant_id)
+        except Exception as e:
+            return {"index": i, "status": "failed", "error": str(e)}
+    
+    if nested:
+        results = [await run_iteration(i, item) for i, item in iterations]
+    else:
+        async def run_slotted(i: int, item: Any) -> Dict[str, Any]:
+            async with semaphore:
+                return await run_iteration(i, item)
+        
+        results = await asyncio.gather(*(run_slotted(i, item) for i, item in iterations))
     
     return {"iterations": len(results), "results": results}
 
 
+async def _execute_iteration(
+    index: int,
+    item: Any,
+    sub_steps: List[Dict[str, Any]],
+    context: Dict[str, Any],
+    tenant_id: str,
+) -> Dict[str, Any]:
+    """Run the loop sub-steps for one item."""
+    iteration_context = {**context, "item": item, "index": index}
+    outputs = []
+    
+    for j, step_config in enumerate(sub_steps):
+        handler = STEP_HANDLERS.get(step_config.get("type"))
+        if handler is None:
+            raise ValueError(f"Unknown step type: {step_config.get('type')}")
+        
+        # Set up the next sub-step while this one waits on its LLM/tool
+        prepare = (
+            asyncio.create_task(prepare_step(sub_steps[j + 1], tenant_id))
+            if j + 1 < len(sub_steps) else None
+        )
+        try:
+            output = await handler(step_config, iteration_context, tenant_id)
+        finally:
+            if prepare is not None:
+                await prepare
+        iteration_context[f"loop_step_{j}_output"] = output
+        outputs.append(output)
+    
+    return {"index": index, "item": item, "outputs": outputs}
+
+
+async def prepare_step(config: Dict[str, Any], tenant_id: Optional[str]):
+    """
+    Warm the caches a step will hit (best-effort, errors ignored).
+    
+    Tenant LLM config + chat model for LLM steps, parsed templates and
+    compiled conditions for the others.
+    """
+    try:
+        step_type = config.get("type")
+        if step_type == "llm_generate":
+            compile_template(config.get("user_suffix", config.get("prompt", "")))
+            await resolve_step_llm(config, tenant_id)
+        elif step_type == "tool_call":
+            for value in config.get("input", {}).values():
+                if isinstance(value, str):
+                    compile_template(value)
+        elif step_type == "condition":
+            compile_condition(config.get("condition", "true"))
+    except Exception as e:
+        logger.debug("Step prepare failed", step_type=config.get("type"), error=str(e))
+
+
 async def execute_approval_step(
     config: Dict[str, Any],
     context: Dict[str, Any],
@@ -415,26 +846,25 @@ async def execute_approval_step(
     }
 
 
+# step type -> handler(config, context, tenant_id)
+STEP_HANDLERS: Dict[str, StepHandler] = {
+    "llm_generate": execute_llm_step,
+    "tool_call": execute_tool_step,
+    "condition": execute_condition_step,
+    "loop": execute_loop_step,
+    "human_approval": execute_approval_step,
+}
+
+
 async def load_workflow_from_backend(
     workflow_id: str,
     tenant_id: str,
 ) -> Optional[Dict[str, Any]]:
-    """Load workflow definition from backend API using BackendClient."""
-    from services.backend_client import get_backend_client
-    
+    """Load workflow definition, tasks and referenced agents/prompts from the backend."""
     client = get_backend_client()
     
     try:
-        # Get workflow
-        workflow = await client.get_workflow(workflow_id)
-        if not workflow:
-            return None
-        
-        # Get tasks
-        tasks = await client.get_workflow_tasks(workflow_id)
-        workflow["tasks"] = tasks
-        
-        return workflow
+        return await client.get_workflow_bundle(workflow_id)
         
     except Exception as e:
         logger.error("Failed to load workflow", error=str(e))
@@ -448,8 +878,6 @@ async def notify_workflow_completed(
     result: Dict[str, Any],
 ):
     """Notify backend of workflow completion via BackendClient."""
-    from services.backend_client import get_backend_client
-    
     client = get_backend_client()
     
     await client.complete_execution(
@@ -466,8 +894,6 @@ async def notify_workflow_failed(
     error: str,
 ):
     """Notify backend of workflow failure via BackendClient."""
-    from services.backend_client import get_backend_client
-    
     client = get_backend_client()
     
     await client.fail_execution(
@@ -483,8 +909,6 @@ async def get_llm_for_tenant(tenant_id: str) -> tuple[str, str, str]:
     Returns:
         (api_key, provider, model)
     """
-    from services.backend_client import get_backend_client
-    
     client = get_backend_client()
     config = await client.get_tenant_llm_config(tenant_id)
     
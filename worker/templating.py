@@ -0,0 +1,55 @@
+"""
+Templating - `{key}` placeholder substitution shared by graphs and tasks.
+
+Templates are parsed once (cached) into a renderer joining precomputed
+literals with context values. Kept free of worker imports and fully
+annotated so it can be compiled with mypyc, like tasks/_step_dispatch.py.
+"""
+from typing import Any, Callable, Dict
+from functools import lru_cache
+import re
+
+
+# {variable} placeholders in step configs
+VAR_RE = re.compile(r"\{([^{}]+)\}")
+
+
+TemplateRenderer = Callable[[Dict[str, Any], Callable[[Any], str]], str]
+
+
+@lru_cache(maxsize=4096)
+def compile_template(template: str) -> TemplateRenderer:
+    """
+    Parse a template's placeholders once into a renderer.
+
+    The renderer joins the precomputed literals with the rendered context
+    values; unknown keys are kept as `{key}`.
+    """
+    pieces = VAR_RE.split(template)  # literal, key, literal, ..., literal
+    if len(pieces) == 1:
+        return lambda context, render: template
+
+    head = pieces[0]
+    # (key, placeholder kept when unknown, literal that follows)
+    slots = tuple(
+        (key, "{" + key + "}", literal)
+        for key, literal in zip(pieces[1::2], pieces[2::2])
+    )
+
+    def render_template(context: Dict[str, Any], render: Callable[[Any], str]) -> str:
+        out = [head]
+        for key, placeholder, literal in slots:
+            out.append(render(context[key]) if key in context else placeholder)
+            out.append(literal)
+        return "".join(out)
+
+    return render_template
+
+
+def substitute_variables(
+    template: str,
+    context: Dict[str, Any],
+    render: Callable[[Any], str] = str,
+) -> str:
+    """Replace `{key}` placeholders from context (template parsed once, then cached)."""
+    return compile_template(template)(context, render)
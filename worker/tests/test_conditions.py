@@ -0,0 +1,30 @@
+"""
+Workflow condition steps (run from worker/: python -m pytest tests).
+"""
+import asyncio
+
+import pytest
+
+from tasks.workflow_tasks import execute_condition_step
+
+
+def evaluate(condition, context):
+    return asyncio.run(execute_condition_step({"condition": condition}, context))
+
+
+def test_false_condition_is_not_met():
+    assert evaluate("{x} > 5", {"x": 1}) == {"condition_met": False}
+
+
+def test_true_condition_is_met():
+    assert evaluate("{x} > 5 and {status} == 'ok'", {"x": 7, "status": "ok"}) == {"condition_met": True}
+
+
+def test_missing_variable_fails_the_step():
+    with pytest.raises(ValueError):
+        evaluate("{x} > 5", {})
+
+
+def test_unsupported_syntax_fails_the_step():
+    with pytest.raises(ValueError):
+        evaluate("__import__('os')", {})
@@ -0,0 +1,63 @@
+"""
+Tools Rate Limits - Client-side token buckets for provider APIs.
+
+Requests wait locally for a token instead of bursting into the provider's
+limit and coming back as 429s (see tools.resilience for those that still
+do). Buckets are per (provider, account); a tool's `rate_limits` config
+overrides the defaults, e.g. {"hubspot": {"rate": 50, "per": 10}}.
+"""
+from typing import Any, Dict, Hashable, Optional, Tuple
+import asyncio
+import weakref
+from aiolimiter import AsyncLimiter
+
+
+# Published limits: (max requests, period in seconds)
+DEFAULT_RATE_LIMITS: Dict[str, Tuple[float, float]] = {
+    "hubspot": (100, 10),
+    "sendgrid": (10_000, 86_400),
+    "google_calendar": (500, 100),  # per user; batch items count individually
+}
+FALLBACK_RATE_LIMIT = (10, 1)
+
+_LimiterKey = Tuple[str, Hashable]
+
+_configured: Dict[_LimiterKey, Tuple[float, float]] = {}
+
+# Per loop too: AsyncLimiter waiters are futures of the loop that created them
+_limiters: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[_LimiterKey, AsyncLimiter]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def configure_rate_limit(provider: str, account: Hashable, rate_limits: Optional[Dict[str, Any]]):
+    """Apply a tool's `rate_limits` override for a provider account (no-op without one)."""
+    override = (rate_limits or {}).get(provider)
+    if not override:
+        return
+    limit = (float(override["rate"]), float(override["per"]))
+    key = (provider, account)
+    if _configured.get(key) != limit:
+        _configured[key] = limit
+        for limiters in _limiters.values():
+            limiters.pop(key, None)
+
+
+def get_rate_limiter(provider: str, account: Hashable) -> AsyncLimiter:
+    """
+    Token bucket for a provider account, on the running loop.
+
+    Usage:
+        async with get_rate_limiter("hubspot", api_key):
+            ...
+    """
+    limiters = _limiters.get(asyncio.get_running_loop())
+    if limiters is None:
+        limiters = _limiters[asyncio.get_running_loop()] = {}
+
+    key = (provider, account)
+    limiter = limiters.get(key)
+    if limiter is None:
+        rate, per = _configured.get(key) or DEFAULT_RATE_LIMITS.get(provider, FALLBACK_RATE_LIMIT)
+        limiter = limiters[key] = AsyncLimiter(rate, per)
+    return limiter
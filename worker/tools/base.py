@@ -2,7 +2,13 @@
 Base Tool - Abstract base class for all MCP tools.
 """
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional, Type
+from typing import Any, Dict, Iterable, List, Optional, Type
+import asyncio
+import itertools
+import logging
+import threading
+import uuid
+import weakref
 from pydantic import BaseModel
 from langchain_core.tools import BaseTool as LangChainBaseTool
 import structlog
@@ -10,6 +16,80 @@ import structlog
 logger = structlog.get_logger()
 
 
+# Mock-mode IDs: a per-process run tag and a counter (unique across workers, no uuid per call)
+_MOCK_RUN = uuid.uuid4().hex[:12]
+_mock_ids = itertools.count(1)
+
+
+def _mock_id(kind: str = "") -> str:
+    """ID for mock-mode results, e.g. `mock-event-<run>-42`."""
+    return f"mock-{kind}{_MOCK_RUN}-{next(_mock_ids)}"
+
+
+def _to_address_objs(emails: Iterable[str], seen: Optional[Dict[str, None]] = None) -> List[Dict[str, str]]:
+    """
+    Normalize emails into provider `{"email": ...}` objects.
+
+    Addresses are stripped, lowercased and deduplicated (first occurrence
+    kept). Pass the same `seen` dict across recipient categories to also
+    drop addresses already listed in a previous one (to, then cc, then bcc).
+    """
+    if seen is None:
+        seen = {}
+    fresh = []
+    for email in emails:
+        email = email.strip().lower()
+        if email and email not in seen:
+            seen[email] = None
+            fresh.append(email)
+    return [{"email": email} for email in fresh]
+
+
+# Loop for sync tool calls, run forever in a daemon thread (started on first use)
+_tool_loop: Optional[asyncio.AbstractEventLoop] = None
+_tool_loop_lock = threading.Lock()
+
+
+def get_tool_loop() -> asyncio.AbstractEventLoop:
+    """Get or start the background event loop used by sync tool calls."""
+    global _tool_loop
+    if _tool_loop is None:
+        with _tool_loop_lock:
+            if _tool_loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="tool-loop", daemon=True).start()
+                _tool_loop = loop
+    return _tool_loop
+
+
+# Fire-and-forget tool calls (`await_response=False`): bounded fan-out per loop
+BACKGROUND_CONCURRENCY = 50
+
+_background_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+    weakref.WeakKeyDictionary()
+)
+_background_tasks: set = set()
+
+
+def _background_semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    semaphore = _background_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _background_semaphores[loop] = asyncio.Semaphore(BACKGROUND_CONCURRENCY)
+    return semaphore
+
+
+async def drain_background_tools(timeout: float = 30.0):
+    """Wait for this loop's fire-and-forget tool calls (worker shutdown, before closing tool clients)."""
+    loop = asyncio.get_running_loop()
+    pending = {task for task in _background_tasks if task.get_loop() is loop}
+    if not pending:
+        return
+    _, still_running = await asyncio.wait(pending, timeout=timeout)
+    if still_running:
+        logger.warning("Background tool calls still running at shutdown", count=len(still_running))
+
+
 class ToolInput(BaseModel):
     """Base input schema for tools."""
     pass
@@ -41,35 +121,56 @@ class BaseTool(ABC):
         self.tenant_id = tenant_id
         self.config = config or {}
     
+    def input_schema(self, arguments: Dict[str, Any]) -> Optional[Type[BaseModel]]:
+        """Schema run() validates these arguments against (None: passed as-is)."""
+        return self.args_schema
+    
     @abstractmethod
     async def _execute(self, **kwargs) -> Any:
         """Execute the tool. Must be implemented by subclasses."""
         pass
     
-    async def run(self, **kwargs) -> Any:
+    async def run(self, await_response: bool = True, **kwargs) -> Any:
         """
         Run the tool with logging and error handling.
         
         Args:
+            await_response: If False, run in the background (side effects whose
+                result the caller doesn't need) and return immediately
             **kwargs: Tool arguments
             
         Returns:
-            Tool execution result
+            Tool execution result, or {"status": "queued", "task_id"} in background mode
         """
-        logger.info(
-            "Tool execution started",
-            tool=self.name,
-            tenant_id=self.tenant_id,
-        )
+        if not await_response:
+            task_id = uuid.uuid4().hex
+            task = asyncio.create_task(self._run_in_background(task_id, **kwargs))
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
+            return {"status": "queued", "task_id": task_id}
         
-        try:
-            result = await self._execute(**kwargs)
-            
+        if logger.isEnabledFor(logging.INFO):
             logger.info(
-                "Tool execution completed",
+                "Tool execution started",
                 tool=self.name,
-                success=True,
+                tenant_id=self.tenant_id,
             )
+        
+        try:
+            # Coerce/validate against the input schema; arguments outside it
+            # (e.g. calendar `action`) are passed through untouched
+            schema = self.input_schema(kwargs)
+            if schema is not None:
+                validated = schema.model_validate(kwargs)
+                kwargs = {**kwargs, **validated.model_dump(exclude_unset=True)}
+            result = await self._execute(**kwargs)
+            
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    "Tool execution completed",
+                    tool=self.name,
+                    success=True,
+                )
             
             return result
             
@@ -81,6 +182,20 @@ class BaseTool(ABC):
             )
             raise
     
+    async def _run_in_background(self, task_id: str, **kwargs):
+        """Background run: failures are logged with the task ID, never raised."""
+        async with _background_semaphore():
+            try:
+                await self.run(**kwargs)
+            except Exception as e:
+                logger.error(
+                    "Background tool execution failed",
+                    tool=self.name,
+                    tenant_id=self.tenant_id,
+                    task_id=task_id,
+                    error=str(e),
+                )
+    
     def to_langchain_tool(self) -> LangChainBaseTool:
         """Convert to LangChain tool for use in agents."""
         from langchain_core.tools import StructuredTool
@@ -94,9 +209,8 @@ class BaseTool(ABC):
         )
     
     def _sync_wrapper(self, **kwargs) -> Any:
-        """Sync wrapper for async execute."""
-        import asyncio
-        return asyncio.run(self._execute(**kwargs))
+        """Sync wrapper for async execute (on the shared tool loop, safe inside a running loop)."""
+        return asyncio.run_coroutine_threadsafe(self._execute(**kwargs), get_tool_loop()).result()
     
     async def validate_credentials(self) -> bool:
         """Validate that required credentials are configured."""
@@ -0,0 +1,101 @@
+"""
+Tools Batching - Coalesces concurrent tool operations into provider batch calls.
+
+Operations submitted under the same key (typically the provider and API
+credentials) are flushed together through one batch request: HubSpot
+batch/create, SendGrid personalizations, Google Calendar multipart batch.
+A lone operation goes out on the next loop iteration; operations arriving
+while a request is in flight queue up and leave together when it returns
+(or after the window, or once the batch is full).
+"""
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Sequence, Tuple
+import asyncio
+import structlog
+
+logger = structlog.get_logger()
+
+
+# flush(key, items) -> one result (or exception instance) per item, in order
+BatchFlush = Callable[[Hashable, List[Any]], Awaitable[Sequence[Any]]]
+
+_PendingOp = Tuple[Any, asyncio.Future]
+_Slot = Tuple[asyncio.AbstractEventLoop, Hashable]
+
+
+class MicroBatcher:
+    """
+    Window/size-bounded batching in front of a provider batch endpoint.
+
+    Usage:
+        result = await batcher.submit(api_key, item)
+    """
+
+    def __init__(self, flush: BatchFlush, max_batch: int = 25, window_ms: int = 50):
+        self.flush = flush
+        self.max_batch = max_batch
+        self.window = window_ms / 1000
+        # Keyed by loop too: futures and the flush task belong to the caller's loop
+        self._pending: Dict[_Slot, List[_PendingOp]] = {}
+        self._in_flight: Dict[_Slot, int] = {}
+        self._tasks: set = set()
+
+    async def submit(self, key: Hashable, item: Any) -> Any:
+        """Queue an operation and wait for its result."""
+        loop = asyncio.get_running_loop()
+        slot = (loop, key)
+        future = loop.create_future()
+
+        batch = self._pending.get(slot)
+        if batch is None:
+            batch = self._pending[slot] = []
+            if self._in_flight.get(slot):
+                # Sent when the in-flight request returns, at the latest after the window
+                loop.call_later(self.window, self._fire, slot, batch)
+            else:
+                # Nothing in flight: no added latency, just coalesce this loop iteration
+                loop.call_soon(self._fire, slot, batch)
+        batch.append((item, future))
+
+        if len(batch) >= self.max_batch:
+            self._fire(slot, batch)
+        return await future
+
+    def _fire(self, slot: _Slot, batch: List[_PendingOp]):
+        """Start flushing a batch (no-op if it was already flushed)."""
+        if self._pending.get(slot) is not batch:
+            return
+        del self._pending[slot]
+
+        self._in_flight[slot] = self._in_flight.get(slot, 0) + 1
+        task = slot[0].create_task(self._run(slot, batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, slot: _Slot, batch: List[_PendingOp]):
+        """Send one batch and resolve its futures."""
+        try:
+            try:
+                results = await self.flush(slot[1], [item for item, _ in batch])
+            except Exception as e:
+                logger.error("Tool batch failed", batch_size=len(batch), error=str(e))
+                results = [e] * len(batch)
+
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+        finally:
+            # Short result list or cancelled flush: never leave a caller waiting
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(RuntimeError("Tool batch returned no result for this operation"))
+
+            remaining = self._in_flight.pop(slot) - 1
+            if remaining:
+                self._in_flight[slot] = remaining
+            pending = self._pending.get(slot)
+            if pending is not None and not remaining and not slot[0].is_closed():
+                self._fire(slot, pending)
@@ -1,18 +1,156 @@
 """
 Calendar Tool - Manage calendar events.
 """
-from typing import Optional, List
+from typing import Any, Awaitable, Callable, Dict, Optional, List, Type
 from datetime import datetime, timedelta
-from pydantic import BaseModel
+from functools import lru_cache
+import logging
+import re
+import uuid
+import orjson
+from pydantic import BaseModel, ConfigDict
 import structlog
 
-from tools.base import BaseTool
+try:
+    from ciso8601 import parse_datetime as _parse_datetime
+except ImportError:  # C extension unavailable: stdlib parser
+    def _parse_datetime(value: str) -> datetime:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+from tools._rate import configure_rate_limit, get_rate_limiter
+from tools.base import BaseTool, _mock_id, _to_address_objs
+from tools.batching import MicroBatcher
+from tools.http import get_tool_http_client
 
 logger = structlog.get_logger()
 
 
+GOOGLE_EVENTS_URL = "https://www.googleapis.com/calendar/v3/calendars/primary/events"
+GOOGLE_BATCH_URL = "https://www.googleapis.com/batch/calendar/v3"
+DEFAULT_EVENT_DURATION = timedelta(hours=1)
+_GOOGLE_TIMEZONE = "Europe/Paris"
+_CONTENT_ID_RE = re.compile(r"Content-ID:\s*<response-item(\d+)>", re.IGNORECASE)
+
+_MOCK_CREATED = {"status": "mock_created", "note": "Event not actually created (mock mode)"}
+
+
+@lru_cache(maxsize=64)
+def _google_reminders(minutes: int) -> Dict[str, Any]:
+    """Reminders block, shared per value (only ever serialized, never mutated)."""
+    return {
+        "useDefault": False,
+        "overrides": [{"method": "popup", "minutes": minutes}],
+    }
+
+
+def _build_google_event(
+    title: str,
+    description: Optional[str],
+    start_iso: str,
+    end_iso: str,
+    attendees: Optional[List[str]],
+    location: Optional[str],
+    reminder_minutes: int,
+) -> Dict[str, Any]:
+    """Google Calendar event payload."""
+    event = {
+        "summary": title,
+        "description": description,
+        "start": {"dateTime": start_iso, "timeZone": _GOOGLE_TIMEZONE},
+        "end": {"dateTime": end_iso, "timeZone": _GOOGLE_TIMEZONE},
+        "reminders": _google_reminders(reminder_minutes),
+    }
+    if attendees:
+        event["attendees"] = _to_address_objs(attendees)
+    if location:
+        event["location"] = location
+    return event
+
+
+async def _insert_google_event(oauth_token: str, event: Dict[str, Any]) -> Dict[str, Any]:
+    client = get_tool_http_client()
+    async with get_rate_limiter("google_calendar", oauth_token):
+        response = await client.post(
+            GOOGLE_EVENTS_URL,
+            headers={
+                "Authorization": f"Bearer {oauth_token}",
+                "Content-Type": "application/json",
+            },
+            content=orjson.dumps(event),
+        )
+    response.raise_for_status()
+    return response.json()
+
+
+def _parse_google_batch(text: str, boundary: str, count: int) -> List[Any]:
+    """Split a multipart/mixed batch response into per-item event dicts (or errors)."""
+    results: List[Any] = [RuntimeError("Missing Google Calendar batch response")] * count
+    
+    for part in text.replace("\r\n", "\n").split(f"--{boundary}"):
+        outer, _, inner = part.strip().partition("\n\n")
+        match = _CONTENT_ID_RE.search(outer)
+        if not match:
+            continue
+        
+        # inner: "HTTP/1.1 200 OK", headers, blank line, JSON body
+        status_line, _, rest = inner.partition("\n")
+        _, _, body = rest.partition("\n\n")
+        status = int(status_line.split()[1])
+        index = int(match.group(1))
+        if index >= count:
+            continue
+        
+        if status >= 400:
+            results[index] = RuntimeError(f"Google Calendar error {status}: {body.strip()[:200]}")
+        else:
+            results[index] = orjson.loads(body)
+    
+    return results
+
+
+async def _flush_google_events(oauth_token: str, events: List[Dict[str, Any]]) -> List[Any]:
+    """Insert queued events with one multipart batch request."""
+    if len(events) == 1:
+        return [await _insert_google_event(oauth_token, events[0])]
+    
+    boundary = f"batch_{uuid.uuid4().hex}"
+    body = b"".join(
+        (
+            f"--{boundary}\r\n"
+            "Content-Type: application/http\r\n"
+            f"Content-ID: <item{i}>\r\n\r\n"
+            "POST /calendar/v3/calendars/primary/events\r\n"
+            "Content-Type: application/json\r\n\r\n"
+        ).encode() + orjson.dumps(event) + b"\r\n"
+        for i, event in enumerate(events)
+    ) + f"--{boundary}--\r\n".encode()
+    
+    client = get_tool_http_client()
+    # Google counts each batch item against the quota
+    limiter = get_rate_limiter("google_calendar", oauth_token)
+    await limiter.acquire(min(len(events), limiter.max_rate))
+    response = await client.post(
+        GOOGLE_BATCH_URL,
+        headers={
+            "Authorization": f"Bearer {oauth_token}",
+            "Content-Type": f"multipart/mixed; boundary={boundary}",
+        },
+        content=body,
+    )
+    response.raise_for_status()
+    
+    response_boundary = response.headers.get("Content-Type", "").partition("boundary=")[2].strip('"')
+    return _parse_google_batch(response.text, response_boundary, len(events))
+
+
+# Concurrent inserts with the same OAuth token share one batch request
+_google_event_batcher = MicroBatcher(_flush_google_events, max_batch=25, window_ms=50)
+
+
 class CalendarEventInput(BaseModel):
     """Input schema for creating calendar events."""
+    model_config = ConfigDict(frozen=True)
+    
     title: str
     description: Optional[str] = None
     start_time: str  # ISO format
@@ -47,9 +185,16 @@ class CalendarTool(BaseTool):
     )
     args_schema = CalendarEventInput
     
+    # action -> handler, filled in below the class
+    _ACTIONS: Dict[str, Callable[..., Awaitable[dict]]] = {}
+    
     def get_required_config(self) -> list:
         return ["calendar_provider", "oauth_token"]
     
+    def input_schema(self, arguments: Dict[str, Any]) -> Optional[Type[BaseModel]]:
+        # CalendarEventInput describes creation only: list/delete arguments pass as-is
+        return self.args_schema if arguments.get("action", "create") == "create" else None
+    
     async def _execute(
         self,
         title: str,
@@ -79,17 +224,20 @@ class CalendarTool(BaseTool):
         """
         provider = self.config.get("calendar_provider", "mock")
         
-        if action == "create":
-            return await self._create_event(
-                provider, title, description, start_time, end_time,
-                attendees, location, reminder_minutes
-            )
-        elif action == "list":
-            return await self._list_events(provider, start_time, end_time)
-        elif action == "delete":
-            return await self._delete_event(provider, title)
-        else:
+        handler = self._ACTIONS.get(action)
+        if handler is None:
             raise ValueError(f"Unknown action: {action}")
+        return await handler(
+            self,
+            provider,
+            title=title,
+            description=description,
+            start_time=start_time,
+            end_time=end_time,
+            attendees=attendees,
+            location=location,
+            reminder_minutes=reminder_minutes,
+        )
     
     async def _create_event(
         self,
@@ -103,19 +251,20 @@ class CalendarTool(BaseTool):
         reminder_minutes: int,
     ) -> dict:
         """Create a calendar event."""
-        logger.info(
-            "Creating calendar event",
-            provider=provider,
-            title=title,
-            start_time=start_time,
-        )
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "Creating calendar event",
+                provider=provider,
+                title=title,
+                start_time=start_time,
+            )
         
         # Parse times
-        start = datetime.fromisoformat(start_time.replace("Z", "+00:00"))
+        start = _parse_datetime(start_time)
         if end_time:
-            end = datetime.fromisoformat(end_time.replace("Z", "+00:00"))
+            end = _parse_datetime(end_time)
         else:
-            end = start + timedelta(hours=1)
+            end = start + DEFAULT_EVENT_DURATION
         
         if provider == "google":
             return await self._create_google_event(
@@ -123,14 +272,12 @@ class CalendarTool(BaseTool):
             )
         else:
             # Mock response
-            return {
-                "status": "mock_created",
-                "event_id": f"mock-event-{hash(title)}",
+            return _MOCK_CREATED | {
+                "event_id": _mock_id("event-"),
                 "title": title,
                 "start": start.isoformat(),
                 "end": end.isoformat(),
                 "attendees": attendees or [],
-                "note": "Event not actually created (mock mode)",
             }
     
     async def _create_google_event(
@@ -144,49 +291,32 @@ class CalendarTool(BaseTool):
         reminder_minutes: int,
     ) -> dict:
         """Create event via Google Calendar API."""
-        import httpx
-        
         oauth_token = self.config.get("oauth_token")
+        configure_rate_limit("google_calendar", oauth_token, self.config.get("rate_limits"))
         
-        event = {
-            "summary": title,
-            "description": description,
-            "start": {"dateTime": start.isoformat(), "timeZone": "Europe/Paris"},
-            "end": {"dateTime": end.isoformat(), "timeZone": "Europe/Paris"},
-            "reminders": {
-                "useDefault": False,
-                "overrides": [{"method": "popup", "minutes": reminder_minutes}],
-            },
-        }
+        start_iso = start.isoformat()
+        end_iso = end.isoformat()
+        event = _build_google_event(
+            title, description, start_iso, end_iso, attendees, location, reminder_minutes
+        )
         
-        if attendees:
-            event["attendees"] = [{"email": email} for email in attendees]
-        if location:
-            event["location"] = location
+        data = await _google_event_batcher.submit(oauth_token, event)
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://www.googleapis.com/calendar/v3/calendars/primary/events",
-                headers={"Authorization": f"Bearer {oauth_token}"},
-                json=event,
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            return {
-                "status": "created",
-                "event_id": data.get("id"),
-                "html_link": data.get("htmlLink"),
-                "title": title,
-                "start": start.isoformat(),
-                "end": end.isoformat(),
-            }
+        return {
+            "status": "created",
+            "event_id": data.get("id"),
+            "html_link": data.get("htmlLink"),
+            "title": title,
+            "start": start_iso,
+            "end": end_iso,
+        }
     
     async def _list_events(
         self,
         provider: str,
         start_time: str,
         end_time: str,
+        **_,
     ) -> dict:
         """List calendar events in date range."""
         # TODO: Implement for each provider
@@ -196,11 +326,18 @@ class CalendarTool(BaseTool):
             "note": "Event listing not implemented",
         }
     
-    async def _delete_event(self, provider: str, event_id: str) -> dict:
-        """Delete a calendar event."""
+    async def _delete_event(self, provider: str, title: str, **_) -> dict:
+        """Delete a calendar event (`title` carries the event ID)."""
         # TODO: Implement for each provider
         return {
             "status": "mock_deleted",
-            "event_id": event_id,
+            "event_id": title,
             "note": "Event not actually deleted (mock mode)",
         }
+
+
+CalendarTool._ACTIONS = {
+    "create": CalendarTool._create_event,
+    "list": CalendarTool._list_events,
+    "delete": CalendarTool._delete_event,
+}
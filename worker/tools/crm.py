@@ -1,17 +1,159 @@
 """
 CRM Tool - Interact with CRM systems.
 """
-from typing import Optional, List, Dict, Any
-from pydantic import BaseModel
+from typing import Optional, List, Dict, Any, Awaitable, Callable, Tuple
+from collections import Counter
+import asyncio
+import logging
+import time
+import httpx
+import orjson
+from pydantic import BaseModel, ConfigDict
 import structlog
 
-from tools.base import BaseTool
+from tools._rate import configure_rate_limit, get_rate_limiter
+from tools.base import BaseTool, _mock_id
+from tools.batching import MicroBatcher
+from tools.http import get_tool_http_client
+from tools.resilience import CircuitOpenError, get_circuit_breaker, is_throttled, resilient_call
 
 logger = structlog.get_logger()
 
 
+HUBSPOT_CONTACTS_URL = "https://api.hubapi.com/crm/v3/objects/contacts"
+
+
+async def _hubspot_request(api_key: str, method: str, url: str, **kwargs) -> Dict[str, Any]:
+    """HubSpot API call behind the account's circuit breaker (retried when throttled)."""
+    client = get_tool_http_client()
+    
+    async def request() -> Dict[str, Any]:
+        async with get_rate_limiter("hubspot", api_key):
+            response = await client.request(method, url, **kwargs)
+        response.raise_for_status()
+        return response.json()
+    
+    return await resilient_call(
+        get_circuit_breaker("hubspot", api_key), request, idempotent=method == "GET"
+    )
+
+
+async def _hubspot_post(api_key: str, url: str, content: bytes) -> Dict[str, Any]:
+    """POST a pre-serialized JSON body."""
+    return await _hubspot_request(
+        api_key,
+        "POST",
+        url,
+        headers={
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+        },
+        content=content,
+    )
+
+
+def _properties_body(properties: Dict[str, Any]) -> bytes:
+    """`{"properties": ...}` serialized around the properties, without a wrapper dict."""
+    return b'{"properties":' + orjson.dumps(properties) + b"}"
+
+
+async def _create_hubspot_contacts_batch(api_key: str, bodies: List[bytes], emails: List[str]) -> List[Any]:
+    """One batch/create call; results matched back by (unique, non-empty) email."""
+    try:
+        data = await _hubspot_post(
+            api_key,
+            f"{HUBSPOT_CONTACTS_URL}/batch/create",
+            b'{"inputs":[' + b",".join(bodies) + b"]}",
+        )
+    except httpx.HTTPStatusError as e:
+        if is_throttled(e):
+            raise
+        # One invalid input (e.g. an existing email) rejects the whole batch
+        logger.warning("HubSpot batch create rejected, creating one by one", error=str(e))
+        return await asyncio.gather(
+            *(_hubspot_post(api_key, HUBSPOT_CONTACTS_URL, body) for body in bodies),
+            return_exceptions=True,
+        )
+    
+    # Batch results are not guaranteed to be in input order
+    by_email = {
+        (result.get("properties", {}).get("email") or "").lower(): result
+        for result in data.get("results", [])
+    }
+    return [
+        by_email.get(email) or ValueError("Contact missing from HubSpot batch response")
+        for email in emails
+    ]
+
+
+async def _flush_hubspot_contacts(api_key: str, properties_list: List[Dict[str, Any]]) -> List[Any]:
+    """Create queued contacts, with one batch/create call for those it can match back."""
+    bodies = [_properties_body(properties) for properties in properties_list]
+    emails = [(properties.get("email") or "").lower() for properties in properties_list]
+    
+    # Batch results only identify contacts by email: a contact without one, or
+    # sharing it with another queued contact, is created on its own
+    counts = Counter(emails)
+    batched = [i for i, email in enumerate(emails) if email and counts[email] == 1]
+    if len(batched) < 2:
+        batched = []
+    in_batch = set(batched)
+    single = [i for i in range(len(bodies)) if i not in in_batch]
+    
+    async def create_batch() -> List[Any]:
+        if not batched:
+            return []
+        return await _create_hubspot_contacts_batch(
+            api_key, [bodies[i] for i in batched], [emails[i] for i in batched]
+        )
+    
+    batch_results, *single_results = await asyncio.gather(
+        create_batch(),
+        *(_hubspot_post(api_key, HUBSPOT_CONTACTS_URL, bodies[i]) for i in single),
+        return_exceptions=True,
+    )
+    if isinstance(batch_results, BaseException):
+        batch_results = [batch_results] * len(batched)
+    
+    results: List[Any] = [None] * len(bodies)
+    for i, result in zip(batched, batch_results):
+        results[i] = result
+    for i, result in zip(single, single_results):
+        results[i] = result
+    return results
+
+
+# Concurrent creates for the same HubSpot account share one request
+_hubspot_contact_batcher = MicroBatcher(_flush_hubspot_contacts, max_batch=25, window_ms=50)
+
+
+# HubSpot contact lookups: (api_key, "id:<id>" | "email:<email>") -> (result, expiry)
+CONTACT_CACHE_TTL = 300  # seconds
+CONTACT_CACHE_MAX_SIZE = 10_000
+
+_contact_cache: Dict[Tuple[str, str], Tuple[dict, float]] = {}
+_pending_contacts: Dict[Tuple[asyncio.AbstractEventLoop, str, str], asyncio.Future] = {}
+
+
+_MOCK_CREATED = {"status": "mock_created", "note": "Contact not actually created (mock mode)"}
+
+
+def _contact_key(contact_id: Optional[str], email: Optional[str]) -> str:
+    return f"id:{contact_id}" if contact_id else f"email:{(email or '').lower()}"
+
+
+def invalidate_hubspot_contact(api_key: str, contact_id: str = None, email: str = None):
+    """Drop cached lookups of a contact (by ID and/or email)."""
+    if contact_id:
+        _contact_cache.pop((api_key, _contact_key(contact_id, None)), None)
+    if email:
+        _contact_cache.pop((api_key, _contact_key(None, email)), None)
+
+
 class CRMContactInput(BaseModel):
     """Input for CRM contact operations."""
+    model_config = ConfigDict(frozen=True)
+    
     action: str = "get"  # get, create, update, search
     contact_id: Optional[str] = None
     email: Optional[str] = None
@@ -52,6 +194,9 @@ class CRMTool(BaseTool):
     )
     args_schema = CRMContactInput
     
+    # action -> handler, filled in below the class
+    _ACTIONS: Dict[str, Callable[..., Awaitable[dict]]] = {}
+    
     def get_required_config(self) -> list:
         return ["crm_type", "api_key"]
     
@@ -85,34 +230,43 @@ class CRMTool(BaseTool):
             Operation result
         """
         crm_type = self.config.get("crm_type", "mock")
+        if crm_type == "hubspot":
+            configure_rate_limit("hubspot", self.config.get("api_key"), self.config.get("rate_limits"))
         
-        logger.info(
-            "CRM operation",
-            crm_type=crm_type,
-            action=action,
-            contact_id=contact_id,
-        )
-        
-        if action == "get":
-            return await self._get_contact(crm_type, contact_id, email)
-        elif action == "create":
-            return await self._create_contact(
-                crm_type, email, name, company, phone, status, notes, custom_fields
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "CRM operation",
+                crm_type=crm_type,
+                action=action,
+                contact_id=contact_id,
             )
-        elif action == "update":
-            return await self._update_contact(
-                crm_type, contact_id, email, name, company, phone, status, notes, custom_fields
-            )
-        elif action == "search":
-            return await self._search_contacts(crm_type, email, name, company)
-        else:
+        
+        handler = self._ACTIONS.get(action)
+        if handler is None:
             raise ValueError(f"Unknown action: {action}")
+        
+        try:
+            return await handler(
+                self,
+                crm_type,
+                contact_id=contact_id,
+                email=email,
+                name=name,
+                company=company,
+                phone=phone,
+                status=status,
+                notes=notes,
+                custom_fields=custom_fields,
+            )
+        except CircuitOpenError as e:
+            return {"status": "throttled", "action": action, "retry_after": round(e.retry_after)}
     
     async def _get_contact(
         self,
         crm_type: str,
         contact_id: str = None,
         email: str = None,
+        **_,
     ) -> dict:
         """Get a contact from CRM."""
         if crm_type == "hubspot":
@@ -143,28 +297,26 @@ class CRMTool(BaseTool):
         status: str,
         notes: str,
         custom_fields: Dict[str, Any],
+        **_,
     ) -> dict:
         """Create a new contact in CRM."""
-        logger.info(
-            "Creating CRM contact",
-            crm_type=crm_type,
-            email=email,
-            name=name,
-        )
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "Creating CRM contact",
+                crm_type=crm_type,
+                email=email,
+                name=name,
+            )
         
         if crm_type == "hubspot":
-            return await self._hubspot_create_contact(
+            result = await self._hubspot_create_contact(
                 email, name, company, phone, status, notes, custom_fields
             )
+            invalidate_hubspot_contact(self.config.get("api_key"), result.get("contact_id"), email)
+            return result
         else:
             # Mock response
-            return {
-                "status": "mock_created",
-                "contact_id": f"mock-{hash(email)}",
-                "email": email,
-                "name": name,
-                "note": "Contact not actually created (mock mode)",
-            }
+            return _MOCK_CREATED | {"contact_id": _mock_id(), "email": email, "name": name}
     
     async def _update_contact(
         self,
@@ -179,6 +331,9 @@ class CRMTool(BaseTool):
         custom_fields: Dict[str, Any] = None,
     ) -> dict:
         """Update an existing contact."""
+        if crm_type == "hubspot":
+            invalidate_hubspot_contact(self.config.get("api_key"), contact_id, email)
+        
         return {
             "status": "mock_updated",
             "contact_id": contact_id,
@@ -191,6 +346,7 @@ class CRMTool(BaseTool):
         email: str = None,
         name: str = None,
         company: str = None,
+        **_,
     ) -> dict:
         """Search contacts in CRM."""
         return {
@@ -205,39 +361,69 @@ class CRMTool(BaseTool):
         contact_id: str = None,
         email: str = None,
     ) -> dict:
-        """Get contact from HubSpot."""
-        import httpx
+        """
+        Get contact from HubSpot (cached per account for CONTACT_CACHE_TTL).
         
+        Concurrent lookups of the same contact share one API call.
+        """
         api_key = self.config.get("api_key")
+        key = _contact_key(contact_id, email)
         
-        async with httpx.AsyncClient() as client:
-            if contact_id:
-                url = f"https://api.hubapi.com/crm/v3/objects/contacts/{contact_id}"
-            elif email:
-                url = f"https://api.hubapi.com/crm/v3/objects/contacts/{email}?idProperty=email"
-            else:
-                raise ValueError("Either contact_id or email required")
-            
-            response = await client.get(
-                url,
-                headers={"Authorization": f"Bearer {api_key}"},
-                params={"properties": "email,firstname,lastname,company,phone,hs_lead_status"},
+        entry = _contact_cache.get((api_key, key))
+        if entry is not None and entry[1] > time.monotonic():
+            return entry[0]
+        
+        pending_key = (asyncio.get_running_loop(), api_key, key)
+        pending = _pending_contacts.get(pending_key)
+        if pending is None:
+            pending = _pending_contacts[pending_key] = asyncio.ensure_future(
+                self._hubspot_fetch_contact(contact_id, email)
             )
-            response.raise_for_status()
-            data = response.json()
-            
-            props = data.get("properties", {})
-            return {
-                "status": "found",
-                "contact": {
-                    "id": data.get("id"),
-                    "email": props.get("email"),
-                    "name": f"{props.get('firstname', '')} {props.get('lastname', '')}".strip(),
-                    "company": props.get("company"),
-                    "phone": props.get("phone"),
-                    "status": props.get("hs_lead_status"),
-                },
-            }
+            pending.add_done_callback(lambda _: _pending_contacts.pop(pending_key, None))
+        
+        result = await asyncio.shield(pending)
+        
+        if len(_contact_cache) >= CONTACT_CACHE_MAX_SIZE:
+            # Evict the oldest entry
+            del _contact_cache[next(iter(_contact_cache))]
+        _contact_cache[(api_key, key)] = (result, time.monotonic() + CONTACT_CACHE_TTL)
+        return result
+    
+    async def _hubspot_fetch_contact(
+        self,
+        contact_id: str = None,
+        email: str = None,
+    ) -> dict:
+        """Fetch contact from the HubSpot API."""
+        api_key = self.config.get("api_key")
+        
+        if contact_id:
+            url = f"https://api.hubapi.com/crm/v3/objects/contacts/{contact_id}"
+        elif email:
+            url = f"https://api.hubapi.com/crm/v3/objects/contacts/{email}?idProperty=email"
+        else:
+            raise ValueError("Either contact_id or email required")
+        
+        data = await _hubspot_request(
+            api_key,
+            "GET",
+            url,
+            headers={"Authorization": f"Bearer {api_key}"},
+            params={"properties": "email,firstname,lastname,company,phone,hs_lead_status"},
+        )
+        
+        props = data.get("properties", {})
+        return {
+            "status": "found",
+            "contact": {
+                "id": data.get("id"),
+                "email": props.get("email"),
+                "name": f"{props.get('firstname', '')} {props.get('lastname', '')}".strip(),
+                "company": props.get("company"),
+                "phone": props.get("phone"),
+                "status": props.get("hs_lead_status"),
+            },
+        }
     
     async def _hubspot_create_contact(
         self,
@@ -250,50 +436,35 @@ class CRMTool(BaseTool):
         custom_fields: Dict[str, Any],
     ) -> dict:
         """Create contact in HubSpot."""
-        import httpx
-        
         api_key = self.config.get("api_key")
         
-        # Parse name
-        name_parts = (name or "").split(" ", 1)
-        firstname = name_parts[0] if name_parts else ""
-        lastname = name_parts[1] if len(name_parts) > 1 else ""
+        firstname, _, lastname = (name or "").partition(" ")
         
+        # Empty values are left out (nothing to set on a new contact)
         properties = {
-            "email": email,
-            "firstname": firstname,
-            "lastname": lastname,
+            key: value
+            for key, value in (
+                ("email", email),
+                ("firstname", firstname),
+                ("lastname", lastname),
+                ("company", company),
+                ("phone", phone),
+                ("hs_lead_status", status),
+                ("notes", notes),
+            )
+            if value
         }
-        
-        if company:
-            properties["company"] = company
-        if phone:
-            properties["phone"] = phone
-        if status:
-            properties["hs_lead_status"] = status
-        if notes:
-            properties["notes"] = notes
         if custom_fields:
             properties.update(custom_fields)
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://api.hubapi.com/crm/v3/objects/contacts",
-                headers={
-                    "Authorization": f"Bearer {api_key}",
-                    "Content-Type": "application/json",
-                },
-                json={"properties": properties},
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            return {
-                "status": "created",
-                "contact_id": data.get("id"),
-                "email": email,
-                "name": name,
-            }
+        data = await _hubspot_contact_batcher.submit(api_key, properties)
+        
+        return {
+            "status": "created",
+            "contact_id": data.get("id"),
+            "email": email,
+            "name": name,
+        }
     
     async def _pipedrive_get_contact(
         self,
@@ -306,3 +477,11 @@ class CRMTool(BaseTool):
             "status": "not_implemented",
             "note": "Pipedrive integration coming soon",
         }
+
+
+CRMTool._ACTIONS = {
+    "get": CRMTool._get_contact,
+    "create": CRMTool._create_contact,
+    "update": CRMTool._update_contact,
+    "search": CRMTool._search_contacts,
+}
@@ -1,17 +1,118 @@
 """
 Email Tool - Send emails via various providers.
 """
-from typing import Optional, List
-from pydantic import BaseModel, EmailStr
+from typing import Any, Awaitable, Callable, Dict, Optional, List, Tuple
+from email.message import EmailMessage
+from email.utils import make_msgid
+import asyncio
+import logging
+import httpx
+import orjson
+from pydantic import BaseModel, ConfigDict, EmailStr
 import structlog
 
-from tools.base import BaseTool
+from tools._rate import configure_rate_limit, get_rate_limiter
+from tools.base import BaseTool, _mock_id, _to_address_objs
+from tools.batching import MicroBatcher
+from tools.http import get_tool_http_client
+from tools.resilience import CircuitOpenError, get_circuit_breaker, is_throttled, resilient_call
+from tools.smtp import get_smtp_session
 
 logger = structlog.get_logger()
 
 
+SENDGRID_SEND_URL = "https://api.sendgrid.com/v3/mail/send"
+
+# (api_key, from_email, subject, content type, body): messages sharing all of
+# these differ only by recipients and can go out as personalizations of one send
+_SendGridKey = Tuple[str, str, str, str, str]
+
+
+async def _sendgrid_send(api_key: str, content: bytes) -> Optional[str]:
+    """POST a pre-serialized mail/send body."""
+    client = get_tool_http_client()
+    
+    async def send() -> Optional[str]:
+        async with get_rate_limiter("sendgrid", api_key):
+            response = await client.post(
+                SENDGRID_SEND_URL,
+                headers={
+                    "Authorization": f"Bearer {api_key}",
+                    "Content-Type": "application/json",
+                },
+                content=content,
+            )
+        response.raise_for_status()
+        return response.headers.get("X-Message-Id")
+    
+    return await resilient_call(get_circuit_breaker("sendgrid", api_key), send)
+
+
+async def _flush_sendgrid(key: _SendGridKey, personalizations: List[Dict[str, Any]]) -> List[Any]:
+    """Send queued messages as one mail/send with a personalization each."""
+    api_key, from_email, subject, content_type, body = key
+    
+    # Serialized once: the message part shared by the batch and any one-by-one fallback
+    tail = b"]," + orjson.dumps({
+        "from": {"email": from_email},
+        "subject": subject,
+        "content": [{"type": content_type, "value": body}],
+    })[1:]
+    parts = [orjson.dumps(p) for p in personalizations]
+    
+    def payload(batch: List[bytes]) -> bytes:
+        return b'{"personalizations":[' + b",".join(batch) + tail
+    
+    if len(parts) == 1:
+        return [await _sendgrid_send(api_key, payload(parts))]
+    
+    try:
+        message_id = await _sendgrid_send(api_key, payload(parts))
+    except httpx.HTTPStatusError as e:
+        if is_throttled(e):
+            raise
+        # One invalid recipient rejects the whole request
+        logger.warning("SendGrid batch rejected, sending one by one", error=str(e))
+        return await asyncio.gather(
+            *(_sendgrid_send(api_key, payload([part])) for part in parts),
+            return_exceptions=True,
+        )
+    return [message_id] * len(personalizations)
+
+
+_MOCK_SENT = {"status": "mock_sent", "note": "Email not actually sent (mock mode)"}
+
+
+# Identical messages to different recipients sent in the same tick share one request
+_sendgrid_batcher = MicroBatcher(_flush_sendgrid, max_batch=25, window_ms=50)
+
+
+def _build_mime(
+    subject: str,
+    from_email: str,
+    to: List[str],
+    cc: Optional[List[str]],
+    body: str,
+    html: bool,
+) -> EmailMessage:
+    """Build the SMTP message (CPU-bound encoding: run it in a thread)."""
+    msg = EmailMessage()
+    msg["Subject"] = subject
+    msg["From"] = from_email
+    msg["To"] = ", ".join(to)
+    if cc:
+        msg["Cc"] = ", ".join(cc)
+    # Domain from the sender: make_msgid() would otherwise resolve the local FQDN
+    msg["Message-ID"] = make_msgid(domain=(from_email or "").rpartition("@")[2] or None)
+    
+    msg.set_content(body, subtype="html" if html else "plain")
+    return msg
+
+
 class EmailInput(BaseModel):
     """Input schema for email tool."""
+    model_config = ConfigDict(frozen=True)
+    
     to: List[str]  # List of recipient emails
     subject: str
     body: str
@@ -39,6 +140,9 @@ class EmailTool(BaseTool):
     )
     args_schema = EmailInput
     
+    # provider -> send method (mock for unknown providers), filled in below the class
+    _PROVIDERS: Dict[str, Callable[..., Awaitable[dict]]] = {}
+    
     def get_required_config(self) -> list:
         return ["email_provider", "api_key"]  # or smtp_host, smtp_port, etc.
     
@@ -67,43 +171,34 @@ class EmailTool(BaseTool):
         """
         provider = self.config.get("email_provider", "smtp")
         
-        logger.info(
-            "Sending email",
-            provider=provider,
-            to=to,
-            subject=subject,
-        )
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "Sending email",
+                provider=provider,
+                to=to,
+                subject=subject,
+            )
         
-        if provider == "smtp":
-            return await self._send_smtp(to, subject, body, cc, bcc, html)
-        elif provider == "sendgrid":
-            return await self._send_sendgrid(to, subject, body, cc, bcc, html)
-        elif provider == "gmail":
-            return await self._send_gmail(to, subject, body, cc, bcc, html)
-        else:
-            # Mock for development
-            return await self._mock_send(to, subject, body)
+        send = self._PROVIDERS.get(provider, EmailTool._mock_send)
+        return await send(self, to, subject, body, cc, bcc, html)
     
     async def _mock_send(
         self,
         to: List[str],
         subject: str,
         body: str,
+        *_,
     ) -> dict:
         """Mock email sending for development."""
-        logger.info(
-            "MOCK: Email would be sent",
-            to=to,
-            subject=subject,
-            body_preview=body[:100],
-        )
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "MOCK: Email would be sent",
+                to=to,
+                subject=subject,
+                body_preview=body[:100],
+            )
         
-        return {
-            "status": "mock_sent",
-            "message_id": f"mock-{hash(subject)}",
-            "recipients": to,
-            "note": "Email not actually sent (mock mode)",
-        }
+        return _MOCK_SENT | {"message_id": _mock_id(), "recipients": to}
     
     async def _send_smtp(
         self,
@@ -115,38 +210,21 @@ class EmailTool(BaseTool):
         html: bool = False,
     ) -> dict:
         """Send email via SMTP."""
-        import aiosmtplib
-        from email.mime.text import MIMEText
-        from email.mime.multipart import MIMEMultipart
-        
         smtp_host = self.config.get("smtp_host", "localhost")
         smtp_port = self.config.get("smtp_port", 587)
         smtp_user = self.config.get("smtp_user")
         smtp_pass = self.config.get("smtp_pass")
         from_email = self.config.get("from_email", smtp_user)
         
-        # Build message
-        msg = MIMEMultipart("alternative")
-        msg["Subject"] = subject
-        msg["From"] = from_email
-        msg["To"] = ", ".join(to)
+        # Build message off the event loop
+        msg = await asyncio.to_thread(_build_mime, subject, from_email, to, cc, body, html)
         
-        if cc:
-            msg["Cc"] = ", ".join(cc)
+        # Bcc is not in the headers: give the envelope recipients explicitly
+        recipients = list(dict.fromkeys([*to, *(cc or ()), *(bcc or ())]))
         
-        content_type = "html" if html else "plain"
-        msg.attach(MIMEText(body, content_type))
-        
-        # Send
+        # Send over the account's reused connection
         try:
-            await aiosmtplib.send(
-                msg,
-                hostname=smtp_host,
-                port=smtp_port,
-                username=smtp_user,
-                password=smtp_pass,
-                start_tls=True,
-            )
+            await get_smtp_session(smtp_host, smtp_port, smtp_user, smtp_pass).send(msg, recipients)
             
             return {
                 "status": "sent",
@@ -168,44 +246,30 @@ class EmailTool(BaseTool):
         html: bool = False,
     ) -> dict:
         """Send email via SendGrid API."""
-        import httpx
-        
         api_key = self.config.get("api_key")
         from_email = self.config.get("from_email")
+        configure_rate_limit("sendgrid", api_key, self.config.get("rate_limits"))
         
-        payload = {
-            "personalizations": [{
-                "to": [{"email": email} for email in to],
-            }],
-            "from": {"email": from_email},
-            "subject": subject,
-            "content": [{
-                "type": "text/html" if html else "text/plain",
-                "value": body,
-            }],
-        }
+        # SendGrid rejects an address repeated across to/cc/bcc (and bills each one)
+        seen: Dict[str, None] = {}
+        personalization = {"to": _to_address_objs(to, seen)}
         
-        if cc:
-            payload["personalizations"][0]["cc"] = [{"email": e} for e in cc]
-        if bcc:
-            payload["personalizations"][0]["bcc"] = [{"email": e} for e in bcc]
+        for category, emails in (("cc", cc), ("bcc", bcc)):
+            addresses = _to_address_objs(emails or (), seen)
+            if addresses:
+                personalization[category] = addresses
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://api.sendgrid.com/v3/mail/send",
-                headers={
-                    "Authorization": f"Bearer {api_key}",
-                    "Content-Type": "application/json",
-                },
-                json=payload,
-            )
-            response.raise_for_status()
-            
-            return {
-                "status": "sent",
-                "message_id": response.headers.get("X-Message-Id"),
-                "recipients": to,
-            }
+        key = (api_key, from_email, subject, "text/html" if html else "text/plain", body)
+        try:
+            message_id = await _sendgrid_batcher.submit(key, personalization)
+        except CircuitOpenError as e:
+            return {"status": "throttled", "retry_after": round(e.retry_after), "recipients": to}
+        
+        return {
+            "status": "sent",
+            "message_id": message_id,
+            "recipients": to,
+        }
     
     async def _send_gmail(
         self,
@@ -219,3 +283,10 @@ class EmailTool(BaseTool):
         """Send email via Gmail API."""
         # TODO: Implement Gmail API
         return await self._mock_send(to, subject, body)
+
+
+EmailTool._PROVIDERS = {
+    "smtp": EmailTool._send_smtp,
+    "sendgrid": EmailTool._send_sendgrid,
+    "gmail": EmailTool._send_gmail,
+}
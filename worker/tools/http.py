@@ -0,0 +1,42 @@
+"""
+Tools HTTP - Shared connection pool for third-party APIs called by tools.
+
+Google Calendar, HubSpot and SendGrid calls reuse keep-alive (HTTP/2)
+connections instead of opening a client, and a TLS session, per call.
+"""
+from typing import Optional
+import asyncio
+import weakref
+import httpx
+
+
+# One client per event loop: sync tool calls run on the tool loop thread
+# (see tools.base.get_tool_loop), and httpx pools are bound to their loop
+_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_tool_http_client() -> httpx.AsyncClient:
+    """Get or create the tools HTTP client for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _http_clients.get(loop)
+    if client is None or client.is_closed:
+        client = _http_clients[loop] = httpx.AsyncClient(
+            http2=True,
+            # Idle connections outlive the gaps between an agent's tool calls
+            limits=httpx.Limits(
+                max_connections=100,
+                max_keepalive_connections=20,
+                keepalive_expiry=60,
+            ),
+            timeout=httpx.Timeout(10.0, connect=5.0),
+        )
+    return client
+
+
+async def close_tool_http_client():
+    """Close the tools HTTP client of the running event loop."""
+    client = _http_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None and not client.is_closed:
+        await client.aclose()
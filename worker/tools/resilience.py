@@ -0,0 +1,172 @@
+"""
+Tools Resilience - Retries and circuit breaking for throttled provider APIs.
+
+Outbound calls that get 429/503 back (502/504 too for idempotent requests)
+are retried with exponential backoff (or exactly `Retry-After` when the
+provider sends one). Each
+provider account has a circuit breaker: when too many recent calls were
+throttled it opens, and calls fail fast with CircuitOpenError instead of
+hammering an API that is already refusing them.
+"""
+from typing import Awaitable, Callable, Deque, Dict, Hashable, Optional, Tuple, TypeVar
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import time
+import httpx
+from tenacity import (
+    AsyncRetrying,
+    RetryCallState,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_exponential_jitter,
+)
+import structlog
+
+logger = structlog.get_logger()
+
+T = TypeVar("T")
+
+
+THROTTLE_STATUSES = frozenset({429, 502, 503, 504})
+# Refused before processing: safe to resend even a non-idempotent request
+# (a 502/504 may have gone through, e.g. an email already sent)
+REJECTED_STATUSES = frozenset({429, 503})
+
+# Breaker: open when more than THRESHOLD of the calls in WINDOW were throttled
+BREAKER_WINDOW = 10.0  # seconds
+BREAKER_THRESHOLD = 0.2
+BREAKER_MIN_CALLS = 5  # don't open on one unlucky call
+BREAKER_COOLDOWN = 30.0  # seconds, unless Retry-After says otherwise
+
+RETRY_ATTEMPTS = 5
+RETRY_MAX_WAIT = 30.0  # longer Retry-After: give up, the breaker stays open
+_backoff = wait_exponential_jitter(initial=1, max=RETRY_MAX_WAIT)
+
+
+class CircuitOpenError(Exception):
+    """Provider is throttling: call skipped until the breaker closes."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is throttling, retry in {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+def is_throttled(exc: BaseException) -> bool:
+    """True for HTTP errors that mean "slow down" rather than "bad request"."""
+    return isinstance(exc, httpx.HTTPStatusError) and exc.response.status_code in THROTTLE_STATUSES
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    """Seconds from a Retry-After header (delta-seconds or HTTP-date)."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max((parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _wait(retry_state: RetryCallState) -> float:
+    """Honour Retry-After when present, exponential backoff with jitter otherwise."""
+    exc = retry_state.outcome.exception()
+    if isinstance(exc, httpx.HTTPStatusError):
+        delay = _retry_after(exc.response)
+        if delay is not None:
+            return min(delay, RETRY_MAX_WAIT)
+    return _backoff(retry_state)
+
+
+class CircuitBreaker:
+    """Sliding-window throttle-rate breaker for one provider account."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Deque[Tuple[float, bool]] = deque()  # (time, throttled)
+        self._throttled = 0
+        self._open_until = 0.0
+
+    def check(self):
+        """Raise CircuitOpenError while the breaker is open."""
+        remaining = self._open_until - time.monotonic()
+        if remaining > 0:
+            raise CircuitOpenError(self.name, remaining)
+
+    def record(self, throttled: bool, retry_after: Optional[float] = None):
+        """Record a call outcome and open the breaker if the throttle rate is too high."""
+        now = time.monotonic()
+        self._calls.append((now, throttled))
+        self._throttled += throttled
+        while self._calls and self._calls[0][0] < now - BREAKER_WINDOW:
+            self._throttled -= self._calls.popleft()[1]
+
+        if not throttled:
+            return
+        if retry_after is not None:
+            # The provider said exactly when to come back
+            self._open(now + retry_after)
+        elif len(self._calls) >= BREAKER_MIN_CALLS and self._throttled / len(self._calls) > BREAKER_THRESHOLD:
+            self._open(now + BREAKER_COOLDOWN)
+
+    def _open(self, until: float):
+        if until > self._open_until:
+            self._open_until = until
+            logger.warning(
+                "Tool circuit breaker open",
+                provider=self.name,
+                seconds=round(until - time.monotonic(), 1),
+            )
+
+
+_breakers: Dict[Tuple[str, Hashable], CircuitBreaker] = {}
+
+
+def get_circuit_breaker(provider: str, account: Hashable) -> CircuitBreaker:
+    """Breaker for a provider account (rate limits are per account)."""
+    breaker = _breakers.get((provider, account))
+    if breaker is None:
+        breaker = _breakers[(provider, account)] = CircuitBreaker(provider)
+    return breaker
+
+
+async def resilient_call(
+    breaker: CircuitBreaker,
+    call: Callable[[], Awaitable[T]],
+    idempotent: bool = False,
+) -> T:
+    """
+    Run `call` (a request ending in raise_for_status) behind the breaker.
+
+    Throttled responses are retried up to RETRY_ATTEMPTS times: all of
+    THROTTLE_STATUSES for idempotent requests, only REJECTED_STATUSES
+    otherwise. Other errors propagate at once. Raises CircuitOpenError when
+    the breaker is (or becomes) open, without making the call.
+    """
+    retryable = THROTTLE_STATUSES if idempotent else REJECTED_STATUSES
+
+    def should_retry(exc: BaseException) -> bool:
+        return isinstance(exc, httpx.HTTPStatusError) and exc.response.status_code in retryable
+
+    async for attempt in AsyncRetrying(
+        stop=stop_after_attempt(RETRY_ATTEMPTS),
+        wait=_wait,
+        retry=retry_if_exception(should_retry),
+        reraise=True,
+    ):
+        with attempt:
+            breaker.check()
+            try:
+                result = await call()
+            except httpx.HTTPStatusError as e:
+                if is_throttled(e):
+                    retry_after = _retry_after(e.response) if e.response.status_code == 429 else None
+                    breaker.record(True, retry_after)
+                raise
+            breaker.record(False)
+    return result
@@ -0,0 +1,137 @@
+"""
+Tools SMTP - Reused SMTP sessions for the email tool.
+
+Connecting (TCP + STARTTLS + AUTH) costs far more than sending a message,
+so one authenticated connection per server account is kept open and
+reused: messages go out one at a time over it, a NOOP keeps it alive
+between sends, and it is closed after SMTP_IDLE_TIMEOUT without sends.
+"""
+from typing import Dict, List, Optional, Tuple
+from email.message import EmailMessage
+from functools import lru_cache
+import asyncio
+import time
+import weakref
+import structlog
+
+logger = structlog.get_logger()
+
+
+SMTP_NOOP_INTERVAL = 60  # seconds
+SMTP_IDLE_TIMEOUT = 300  # seconds
+
+
+@lru_cache(maxsize=None)
+def _aiosmtplib():
+    """aiosmtplib is only needed by the SMTP provider: imported once, on first send."""
+    import aiosmtplib
+    return aiosmtplib
+
+
+class SMTPSession:
+    """One authenticated SMTP connection (SMTP is one command at a time: sends are serialized)."""
+
+    def __init__(self, hostname: str, port: int, username: Optional[str], password: Optional[str]):
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self._client = None
+        self._lock = asyncio.Lock()
+        self._keepalive: Optional[asyncio.Task] = None
+        self._last_used = 0.0
+
+    async def send(self, msg: EmailMessage, recipients: List[str]):
+        """Send a message, (re)connecting if needed."""
+        aiosmtplib = _aiosmtplib()
+        async with self._lock:
+            self._last_used = time.monotonic()
+            for attempt in range(2):
+                if self._client is None or not self._client.is_connected:
+                    await self._connect()
+                try:
+                    return await self._client.send_message(msg, recipients=recipients)
+                except aiosmtplib.SMTPServerDisconnected:
+                    # Dropped by the server since the last send: reconnect once
+                    self._client = None
+                    if attempt:
+                        raise
+
+    async def _connect(self):
+        client = _aiosmtplib().SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            username=self.username,
+            password=self.password,
+            start_tls=True,
+        )
+        await client.connect()  # EHLO, STARTTLS and AUTH
+        self._client = client
+        if self._keepalive is None or self._keepalive.done():
+            self._keepalive = asyncio.create_task(self._keep_alive())
+
+    async def _keep_alive(self):
+        """NOOP every SMTP_NOOP_INTERVAL; disconnect once idle for SMTP_IDLE_TIMEOUT."""
+        while True:
+            await asyncio.sleep(SMTP_NOOP_INTERVAL)
+            async with self._lock:
+                if self._client is None or not self._client.is_connected:
+                    return
+                if time.monotonic() - self._last_used > SMTP_IDLE_TIMEOUT:
+                    await self._quit()
+                    return
+                try:
+                    await self._client.noop()
+                except Exception as e:
+                    logger.debug("SMTP keepalive failed", host=self.hostname, error=str(e))
+                    self._client = None
+                    return
+
+    async def _quit(self):
+        client, self._client = self._client, None
+        if client is not None and client.is_connected:
+            try:
+                await client.quit()
+            except Exception:
+                client.close()
+
+    async def close(self):
+        """Stop the keepalive and disconnect."""
+        if self._keepalive is not None:
+            self._keepalive.cancel()
+        async with self._lock:
+            await self._quit()
+
+
+_SessionKey = Tuple[str, int, Optional[str], Optional[str]]
+
+# Per event loop, like the HTTP client: the connection's streams belong to its loop
+_sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[_SessionKey, SMTPSession]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_smtp_session(
+    hostname: str,
+    port: int,
+    username: Optional[str],
+    password: Optional[str],
+) -> SMTPSession:
+    """Get or create the SMTP session for a server account on the running loop."""
+    loop = asyncio.get_running_loop()
+    sessions = _sessions.get(loop)
+    if sessions is None:
+        sessions = _sessions[loop] = {}
+
+    key = (hostname, port, username, password)
+    session = sessions.get(key)
+    if session is None:
+        session = sessions[key] = SMTPSession(hostname, port, username, password)
+    return session
+
+
+async def close_smtp_sessions():
+    """Close the SMTP sessions of the running event loop."""
+    sessions = _sessions.pop(asyncio.get_running_loop(), None) or {}
+    for session in sessions.values():
+        await session.close()